@@ -0,0 +1,182 @@
+import argparse
+import csv
+import datetime
+import itertools
+import os
+
+import history_store
+import team_stats
+from match import Match
+from state_manager import history_entry
+
+MATCHES_FILE = "matches.csv"
+POINTS_FILE = "points.csv"
+
+# The archive schema. Columns are only ever appended, so readers keyed on
+# these names keep working.
+MATCH_COLUMNS = ("match_id", "date", "team1_name", "team2_name", "games_per_set",
+                 "total_sets", "score", "duration", "winner", "points_played", "uid")
+# Columns added after the first version; archives without them still import.
+OPTIONAL_MATCH_COLUMNS = ("uid",)
+# `team` is 1 or 2; `seconds` and `ms` are the match time of the point, in
+# whole seconds and in milliseconds.
+POINT_COLUMNS = ("match_id", "point", "team", "seconds", "ms")
+OPTIONAL_POINT_COLUMNS = ("ms",)
+
+# Rows handed to csv.writer / fetched from the database at a time.
+BATCH_SIZE = 1000
+
+def export_archive(directory, batch_size=BATCH_SIZE):
+    # Write every stored match to <directory>/matches.csv and every point to
+    # <directory>/points.csv, one match at a time. Returns the match count.
+    os.makedirs(directory, exist_ok=True)
+    exported = 0
+    with open(os.path.join(directory, MATCHES_FILE), "w", newline="", encoding="utf-8") as matches_file, \
+         open(os.path.join(directory, POINTS_FILE), "w", newline="", encoding="utf-8") as points_file:
+        matches_writer = csv.writer(matches_file)
+        points_writer = csv.writer(points_file)
+        matches_writer.writerow(MATCH_COLUMNS)
+        points_writer.writerow(POINT_COLUMNS)
+        for record in history_store.iter_point_records(batch_size):
+            point_teams, point_times = history_store.compact_points(record)
+            point_ms = history_store.compact_point_ms(record)
+            if record["team1"].endswith(" 🎾"):
+                winner = 1
+            elif record["team2"].endswith(" 🎾"):
+                winner = 2
+            else:
+                winner = ""
+            matches_writer.writerow((
+                record["id"], record["date"], record["team1_name"], record["team2_name"],
+                record["games_per_set"] or "", record["total_sets"] or "",
+                record["score"], record["duration"], winner, len(point_teams), record["uid"] or ""
+            ))
+            match_id = record["id"]
+            points_writer.writerows(
+                (match_id, number, team_index + 1, seconds, ms)
+                for number, (team_index, seconds, ms) in enumerate(zip(point_teams, point_times, point_ms), 1)
+            )
+            exported += 1
+    return exported
+
+def _read_rows(path, columns, optional_columns=()):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = tuple(next(reader, ()))
+        required = tuple(column for column in columns if column not in optional_columns)
+        if not set(required) <= set(header):
+            raise ValueError(f"{path}: expected columns {', '.join(required)}")
+        for row in reader:
+            yield dict(zip(header, row))
+
+def replay_row(row, points):
+    # Rebuild a Match from an archive row and its point rows, or raise
+    # ValueError if the points do not produce the recorded result.
+    formats = history_store.candidate_formats(row["games_per_set"], row["total_sets"], row["score"])
+    for games_per_set, total_sets in formats[:-1]:
+        try:
+            return _replay(row, points, games_per_set, total_sets)
+        except ValueError:
+            pass
+    return _replay(row, points, *formats[-1])
+
+def _replay(row, points, games_per_set, total_sets):
+    match = Match(row["team1_name"], row["team2_name"], games_per_set, total_sets)
+    match.start_time = datetime.datetime.strptime(row["date"], "%Y-%m-%d %H:%M:%S")
+    for point in points:
+        if match.match_over:
+            raise ValueError(f"match {row['match_id']}: points after the end of the match")
+        team = int(point["team"])
+        if team not in (1, 2):
+            raise ValueError(f"match {row['match_id']}: invalid team {point['team']!r}")
+        if point.get("ms"):
+            elapsed = datetime.timedelta(milliseconds=int(point["ms"]))
+        else:
+            elapsed = datetime.timedelta(seconds=int(point["seconds"]))
+        match.add_point_index(team - 1, elapsed)
+    if not match.match_over:
+        raise ValueError(f"match {row['match_id']}: the points do not finish the match")
+    entry = history_entry(match)
+    if entry["score"] != row["score"]:
+        raise ValueError(f"match {row['match_id']}: replayed score {entry['score']} "
+                         f"does not match {row['score']}")
+    if row["winner"] and match.winner != (match.team1_name, match.team2_name)[int(row["winner"]) - 1]:
+        raise ValueError(f"match {row['match_id']}: replayed winner {match.winner} does not match")
+    return match
+
+def _points_by_match(points_rows):
+    # Consecutive point rows grouped per match_id.
+    return itertools.groupby(points_rows, key=lambda point: point["match_id"])
+
+def iter_archive(directory, errors=None):
+    # (match row, list of point rows) per match. Both files list the matches
+    # in the same order, so they are merged in a single pass. Match ids are
+    # compared as strings, whatever they look like; point rows of a match
+    # missing from matches.csv, or out of its order, are skipped and
+    # reported in `errors`.
+    matches_path = os.path.join(directory, MATCHES_FILE)
+    match_ids = {row["match_id"] for row in _read_rows(matches_path, MATCH_COLUMNS, OPTIONAL_MATCH_COLUMNS)}
+    seen = set()
+    point_groups = _points_by_match(_read_rows(os.path.join(directory, POINTS_FILE), POINT_COLUMNS,
+                                                OPTIONAL_POINT_COLUMNS))
+    pending = next(point_groups, None)
+    for row in _read_rows(matches_path, MATCH_COLUMNS, OPTIONAL_MATCH_COLUMNS):
+        seen.add(row["match_id"])
+        while pending is not None and (pending[0] not in match_ids or
+                                       (pending[0] in seen and pending[0] != row["match_id"])):
+            if errors is not None:
+                errors.append(f"points of match {pending[0]}: not in {MATCHES_FILE} or out of its order")
+            pending = next(point_groups, None)
+        if pending is not None and pending[0] == row["match_id"]:
+            points = list(pending[1])
+            pending = next(point_groups, None)
+        else:
+            points = []
+        yield row, points
+    while pending is not None:
+        if errors is not None:
+            errors.append(f"points of match {pending[0]}: not in {MATCHES_FILE} or out of its order")
+        pending = next(point_groups, None)
+
+def import_archive(directory, batch_size=BATCH_SIZE):
+    # Replay every archived match and store the ones that validate. Returns
+    # (count of matches newly stored, list of error messages for the rejected
+    # matches); matches already in the history are not counted.
+    errors = []
+
+    def records():
+        for row, points in iter_archive(directory, errors):
+            try:
+                match = replay_row(row, points)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            entry = history_entry(match)
+            entry["duration"] = row["duration"]
+            # Matches already in the history (same uid, or same date, teams
+            # and score for rows without one) are not stored again.
+            yield (entry, match.team1_name, match.team2_name, match.games_per_set,
+                   match.total_sets, match.point_teams, match.point_times, row.get("uid") or None,
+                   match.point_ms)
+
+    imported = len(history_store.append_many(records(), batch_size))
+    if imported:
+        team_stats.rebuild()
+    return imported, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import the match archive as CSV.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("directory", help=f"directory holding {MATCHES_FILE} and {POINTS_FILE}")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Exported {export_archive(args.directory)} matches to {args.directory}")
+    else:
+        imported, errors = import_archive(args.directory)
+        for error in errors:
+            print(f"Skipped {error}")
+        print(f"Imported {imported} matches, skipped {len(errors)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import history_store
+import scoreboard
+import state_manager
+import timeline
+from match import Match
+
+# Benchmarks of the scoring, persistence, history, board and analysis hot
+# paths on synthetic matches, and of each page's cold start. Everything runs in a temporary directory, so
+# the app's own state and history are never touched.
+#
+#   python benchmark.py --output results.json
+#   python benchmark.py --output new.json --compare results.json --threshold 0.2
+
+# Synthetic match kinds: (games_per_set, total_sets, probability that the
+# server wins a point, whether the match must end in a super tiebreak).
+# Strong serves make games go with serve, so sets reach tiebreaks.
+MATCH_KINDS = {
+    "short": (4, 1, 0.6, False),
+    "regular": (6, 1, 0.6, False),
+    "best_of_3": (6, 3, 0.6, False),
+    "tiebreak_heavy": (6, 3, 0.85, False),
+    "super_tiebreak": (6, 3, 0.6, True),
+    "long": (9, 5, 0.75, False),
+}
+
+DEFAULT_HISTORY_SIZES = (10, 1000, 10000, 100000)
+# load_history() rebuilds every point timeline, so it is only timed up to
+# this many matches.
+LOAD_HISTORY_MAX_MATCHES = 1000
+DEFAULT_THRESHOLD = 0.1
+# Seconds between synthetic points.
+POINT_SECONDS = 25
+
+def generate_points(rng, games_per_set, total_sets, serve_probability, super_tiebreak=False):
+    # Team index of every point of one complete match. Team 1 serves first
+    # and service alternates every game (every two points in tiebreaks).
+    while True:
+        match = Match("", "", games_per_set, total_sets)
+        points = match._points
+        point_teams = []
+        games_played = 0
+        while not match.match_over:
+            if match.game_mode == "regular":
+                server = games_played & 1
+            else:
+                server = (games_played + (points[0] + points[1] + 1) // 2) & 1
+            team_index = server if rng.random() < serve_probability else 1 - server
+            match._score_point(team_index)
+            point_teams.append(team_index)
+            if points[0] == points[1] == 0:
+                games_played += 1
+        if not super_tiebreak or match.game_mode == "super_tiebreak":
+            return point_teams
+
+def generate_match(rng, kind, team1_name="Team A", team2_name="Team B"):
+    # A finished Match of the given MATCH_KINDS kind, with points
+    # POINT_SECONDS apart.
+    games_per_set, total_sets, serve_probability, super_tiebreak = MATCH_KINDS[kind]
+    match = Match(team1_name, team2_name, games_per_set, total_sets)
+    match.start_time = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    for number, team_index in enumerate(generate_points(rng, games_per_set, total_sets,
+                                                        serve_probability, super_tiebreak), 1):
+        match.add_point_index(team_index, datetime.timedelta(seconds=number * POINT_SECONDS))
+    return match
+
+def _median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def _result(value, unit, better="lower"):
+    return {"value": value, "unit": unit, "better": better}
+
+def bench_add_point(rng, results):
+    for kind in MATCH_KINDS:
+        games_per_set, total_sets, serve_probability, super_tiebreak = MATCH_KINDS[kind]
+        sequences = [generate_points(rng, games_per_set, total_sets, serve_probability, super_tiebreak)
+                     for _ in range(20)]
+        elapsed = datetime.timedelta(seconds=POINT_SECONDS)
+        total_points = sum(len(sequence) for sequence in sequences)
+
+        def play():
+            for sequence in sequences:
+                match = Match("A", "B", games_per_set, total_sets)
+                for team_index in sequence:
+                    match.add_point("B" if team_index else "A", elapsed)
+
+        results[f"add_point.{kind}"] = _result(total_points / _median_seconds(play, 5),
+                                               "points/s", "higher")
+
+def bench_state(rng, results):
+    for kind in ("short", "best_of_3", "long"):
+        match = generate_match(rng, kind)
+        results[f"save_state.{kind}"] = _result(
+            _median_seconds(lambda: state_manager.save_state(match), 20) * 1e3, "ms")
+        results[f"load_state.{kind}"] = _result(
+            _median_seconds(state_manager.load_state, 50) * 1e3, "ms")
+
+    # Per-point save and load as the journal grows through a long match.
+    match = generate_match(rng, "long")
+    live = Match(match.team1_name, match.team2_name, match.games_per_set, match.total_sets)
+    state_manager.save_state(live)
+    save_times, load_times = [], []
+    for team_index in match.point_teams:
+        start = time.perf_counter()
+        state_manager.save_point_index(live, team_index)
+        save_times.append(time.perf_counter() - start)
+        if len(live.point_teams) % 25 == 0:
+            load_times.append(_median_seconds(state_manager.load_state, 3))
+    results["save_point.long"] = _result(statistics.median(save_times) * 1e3, "ms")
+    results["load_state_mid_match.long"] = _result(statistics.median(load_times) * 1e3, "ms")
+
+def _fill_history(matches, count):
+    entries = [(state_manager.history_entry(match), match) for match in matches]
+
+    def records():
+        for number in range(count):
+            entry, match = entries[number % len(entries)]
+            yield (entry, match.team1_name, match.team2_name, match.games_per_set, match.total_sets,
+                   match.point_teams, match.point_times, f"synthetic-{number}", match.point_ms)
+
+    history_store.append_many(records())
+
+def bench_history(rng, results, history_sizes):
+    names = [f"Team {letter}" for letter in "ABCDEFGH"]
+    matches = [generate_match(rng, rng.choice(list(MATCH_KINDS)), *rng.sample(names, 2))
+               for _ in range(50)]
+    stored = 0
+    for size in sorted(history_sizes):
+        _fill_history(matches, max(size - stored, 0))
+        stored = max(size, stored)
+
+        def add():
+            match = generate_match(rng, "best_of_3", *rng.sample(names, 2))
+            start = time.perf_counter()
+            state_manager.add_to_history(match)
+            return time.perf_counter() - start
+
+        add_times = [add() for _ in range(5)]
+        stored += len(add_times)
+        results[f"add_to_history.{size}"] = _result(statistics.median(add_times) * 1e3, "ms")
+        results[f"history_latest.{size}"] = _result(
+            _median_seconds(lambda: history_store.latest(3), 20) * 1e3, "ms")
+        results[f"history_summaries.{size}"] = _result(
+            _median_seconds(history_store.summaries, 3) * 1e3, "ms")
+        if size <= LOAD_HISTORY_MAX_MATCHES:
+            results[f"load_history.{size}"] = _result(
+                _median_seconds(state_manager.load_history, 3) * 1e3, "ms")
+
+def bench_scoreboard(rng, results):
+    for kind in ("short", "best_of_3", "long"):
+        match = generate_match(rng, kind)
+        # Back to mid-match, where the win probability is shown.
+        for _ in range(len(match.point_teams) - len(match.point_teams) // 2):
+            match.undo()
+        scoreboard.build_scoreboard_html(match, "en")
+        results[f"scoreboard_html.{kind}"] = _result(
+            _median_seconds(lambda: scoreboard.build_scoreboard_html(match, "en"), 200) * 1e3, "ms")
+
+def bench_timeline(rng, results):
+    for kind in ("short", "best_of_3", "long"):
+        match_id = state_manager.add_to_history(generate_match(rng, kind))
+        results[f"timeline.{kind}"] = _result(
+            _median_seconds(lambda: timeline.build_timeline(match_id), 20) * 1e3, "ms")
+
+# Modules app.py imports on every page; each page then imports its views
+# module.
+APP_MODULES = "streamlit, state_manager, court_registry, scoreboard, metrics, translations"
+STARTUP_PAGES = ("score_board", "score_track", "match_analysis", "leaderboard")
+
+def bench_startup(rng, results):
+    # Cold import time of each page in a fresh interpreter, as after a
+    # container restart.
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    for page in STARTUP_PAGES:
+        code = (f"import time; start = time.perf_counter(); import {APP_MODULES}; import views.{page}; "
+                f"print(time.perf_counter() - start)")
+        times = [float(subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                                      capture_output=True, text=True).stdout)
+                 for _ in range(3)]
+        results[f"startup_import.{page}"] = _result(statistics.median(times) * 1e3, "ms")
+
+BENCHMARKS = {
+    "add_point": bench_add_point,
+    "state": bench_state,
+    "history": bench_history,
+    "scoreboard": bench_scoreboard,
+    "timeline": bench_timeline,
+    "startup": bench_startup,
+}
+
+def run(selected=None, history_sizes=DEFAULT_HISTORY_SIZES, seed=0):
+    # Run the selected BENCHMARKS (all by default) in a scratch directory.
+    # Returns {"meta": ..., "results": {name: {"value", "unit", "better"}}}.
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            for name in selected or BENCHMARKS:
+                rng = random.Random(f"{seed}-{name}")
+                if name == "history":
+                    bench_history(rng, results, history_sizes)
+                else:
+                    BENCHMARKS[name](rng, results)
+        finally:
+            os.chdir(cwd)
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # Benchmarks that got worse by more than `threshold` (0.1 = 10%), as
+    # (name, baseline value, current value, relative change) tuples.
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / before["value"]
+        worse = change > threshold if result["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append((name, before["value"], result["value"], change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scoring, persistence, history, board and analysis paths.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=DEFAULT_HISTORY_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown counted as a regression (default 0.1)")
+    args = parser.parse_args()
+
+    report = run(args.only, args.history_sizes, args.seed)
+    for name, result in report["results"].items():
+        print(f"{name:32} {result['value']:12.3f} {result['unit']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
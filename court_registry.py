@@ -0,0 +1,66 @@
+import re
+import sqlite3
+
+COURTS_DB = "courts.db"
+DEFAULT_COURT = "main"
+
+# Court ids name directories on disk, so keep them to a safe alphabet.
+COURT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+# Only the list of courts is kept here. Scores stay in each court's own
+# state files, so scoring different courts never writes to a shared file.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courts (
+    court_id TEXT PRIMARY KEY
+);
+"""
+
+OVERVIEW_KEYS = ("court_id", "team1", "team2", "sets1", "sets2", "games1", "games2",
+                 "points1", "points2", "game_mode", "match_over", "winner", "start_time",
+                 "elapsed_ms", "paused")
+
+def validate_court_id(court_id):
+    if not COURT_ID_PATTERN.fullmatch(str(court_id)):
+        raise ValueError(f"Invalid court id: {court_id!r}")
+    return str(court_id)
+
+def _connect():
+    # WAL lets the court list be read while a court is being registered.
+    conn = sqlite3.connect(COURTS_DB, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def register_court(court_id):
+    court_id = validate_court_id(court_id)
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO courts (court_id) VALUES (?)", (court_id,))
+    finally:
+        conn.close()
+    return court_id
+
+def list_courts():
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT court_id FROM courts ORDER BY court_id").fetchall()
+    finally:
+        conn.close()
+    court_ids = [row[0] for row in rows]
+    if DEFAULT_COURT not in court_ids:
+        court_ids.insert(0, DEFAULT_COURT)
+    return court_ids
+
+def overview_row(court_id, match):
+    # All-courts overview row (OVERVIEW_KEYS) of a court's current Match.
+    points = match.game_points()
+    values = (
+        court_id, match.team1_name, match.team2_name,
+        match._sets[0], match._sets[1], match._games[0], match._games[1],
+        str(points[0]), str(points[1]),
+        match.game_mode, int(match.match_over), match.winner,
+        match.start_time.isoformat(), match.elapsed_ms(), match.paused
+    )
+    return dict(zip(OVERVIEW_KEYS, values))
@@ -0,0 +1,369 @@
+import os
+import pickle
+import sqlite3
+from array import array
+from match import build_point_history, parse_match_time
+
+HISTORY_DB = "match_history.db"
+# Monolithic pickle used by earlier versions; imported once into the database.
+LEGACY_HISTORY_FILE = "match_history.pkl"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    team1 TEXT NOT NULL,
+    team2 TEXT NOT NULL,
+    team1_name TEXT NOT NULL,
+    team2_name TEXT NOT NULL,
+    score TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    games_per_set INTEGER,
+    total_sets INTEGER,
+    uid TEXT
+);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (date);
+CREATE INDEX IF NOT EXISTS matches_team1_name ON matches (team1_name);
+CREATE INDEX IF NOT EXISTS matches_team2_name ON matches (team2_name);
+-- `data` holds either a pickled (point_teams, point_times[, point_ms]) tuple
+-- of array bytes, from which the events are rebuilt, or a pickled list of
+-- event dicts for matches imported from the legacy pickle.
+CREATE TABLE IF NOT EXISTS point_histories (
+    match_id INTEGER PRIMARY KEY REFERENCES matches (id),
+    data BLOB NOT NULL
+);
+"""
+
+SUMMARY_COLUMNS = "id, date, team1, team2, score, duration"
+
+# Match.uid of every match recorded live, so concurrent sessions noticing the
+# same finished match store it once. Matches from the legacy pickle have none.
+UID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS matches_uid ON matches (uid)"
+
+# Seek indexes of stored matches (see seek_index.py): pickled Match
+# checkpoints and set scores.
+SEEK_INDEX_TABLE = """
+CREATE TABLE IF NOT EXISTS seek_indexes (
+    match_id INTEGER PRIMARY KEY REFERENCES matches (id),
+    data BLOB NOT NULL
+)
+"""
+
+# Whether this process has checked the schema of the database.
+_schema_checked = False
+
+def _connect():
+    global _schema_checked
+    is_new = not os.path.exists(HISTORY_DB)
+    conn = sqlite3.connect(HISTORY_DB, timeout=10)
+    if is_new or not _schema_checked:
+        _prepare_schema(conn)
+        _schema_checked = True
+    return conn
+
+def _prepare_schema(conn):
+    # Create the database (importing the legacy pickle) or add the columns
+    # of newer versions. The immediate transaction makes processes starting
+    # together do this one at a time.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(matches)")]
+        if not columns:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            _import_legacy_history(conn)
+        elif "uid" not in columns:
+            conn.execute("ALTER TABLE matches ADD COLUMN uid TEXT")
+        conn.execute(UID_INDEX)
+        conn.execute(SEEK_INDEX_TABLE)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def _import_legacy_history(conn):
+    if not os.path.exists(LEGACY_HISTORY_FILE):
+        return
+    with open(LEGACY_HISTORY_FILE, "rb") as f:
+        history = pickle.load(f)
+    for entry in history:
+        _insert(conn, entry,
+                entry["team1"].replace(" 🎾", ""),
+                entry["team2"].replace(" 🎾", ""))
+
+def _insert(conn, entry, team1_name, team2_name, games_per_set=None, total_sets=None,
+            point_teams=None, point_times=None, uid=None, point_ms=None):
+    # Returns (match id, whether it was stored now): a match whose `uid` is
+    # already stored keeps its existing id. Matches without a uid (legacy
+    # ones) are told apart by their date, teams and score instead.
+    if uid is None:
+        row = conn.execute(
+            "SELECT id FROM matches WHERE uid IS NULL AND date = ? AND team1_name = ?"
+            " AND team2_name = ? AND score = ?",
+            (entry["date"], team1_name, team2_name, entry["score"])
+        ).fetchone()
+        if row is not None:
+            return row[0], False
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO matches (date, team1, team2, team1_name, team2_name, score, duration,"
+        " games_per_set, total_sets, uid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (entry["date"], entry["team1"], entry["team2"], team1_name, team2_name,
+         entry["score"], entry["duration"], games_per_set, total_sets, uid)
+    )
+    if cur.rowcount == 0:
+        return conn.execute("SELECT id FROM matches WHERE uid = ?", (uid,)).fetchone()[0], False
+    if point_ms is not None:
+        data = pickle.dumps((point_teams.tobytes(), point_times.tobytes(), point_ms.tobytes()))
+    elif point_teams is not None:
+        data = pickle.dumps((point_teams.tobytes(), point_times.tobytes()))
+    else:
+        data = pickle.dumps(entry.get("point_history", []))
+    conn.execute(
+        "INSERT INTO point_histories (match_id, data) VALUES (?, ?)",
+        (cur.lastrowid, data)
+    )
+    return cur.lastrowid, True
+
+def _summaries(rows):
+    keys = ("id", "date", "team1", "team2", "score", "duration")
+    return [dict(zip(keys, row)) for row in rows]
+
+def append(entry, team1_name, team2_name, games_per_set=None, total_sets=None,
+           point_teams=None, point_times=None, uid=None, point_ms=None):
+    # Store a finished match; `entry` has the add_to_history layout. The
+    # timeline is given either as Match.point_teams/point_times (and
+    # optionally point_ms) arrays or as event dicts in entry["point_history"].
+    # A match already stored (same uid, or for matches without one the same
+    # date, teams and score) is not stored again; its existing id is returned.
+    conn = _connect()
+    try:
+        with conn:
+            return _insert(conn, entry, team1_name, team2_name, games_per_set, total_sets,
+                           point_teams, point_times, uid, point_ms)[0]
+    finally:
+        conn.close()
+
+def append_many(records, batch_size=1000):
+    # Store many finished matches over one connection, committing every
+    # batch_size. `records` is an iterable of append() argument tuples.
+    # Returns the ids of the matches stored, leaving out those already
+    # stored.
+    conn = _connect()
+    ids = []
+    try:
+        batch = 0
+        for record in records:
+            match_id, inserted = _insert(conn, *record)
+            if inserted:
+                ids.append(match_id)
+            batch += 1
+            if batch == batch_size:
+                conn.commit()
+                batch = 0
+        conn.commit()
+    finally:
+        conn.close()
+    return ids
+
+def history_version():
+    # Changes whenever a match is stored; None before the database exists.
+    try:
+        st = os.stat(HISTORY_DB)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def latest(n):
+    # Summaries of the n most recent matches, newest first.
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM matches ORDER BY id DESC LIMIT ?", (n,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return _summaries(rows)
+
+def summaries():
+    # Summaries of every match, oldest first, without point timelines.
+    conn = _connect()
+    try:
+        rows = conn.execute(f"SELECT {SUMMARY_COLUMNS} FROM matches ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    return _summaries(rows)
+
+def find(date=None, team=None):
+    # Lookup by date prefix ("2024-05" or "2024-05-18") and/or team name.
+    clauses, params = [], []
+    if date is not None:
+        clauses.append("date >= ? AND date < ?")
+        params += [date, date + "\uffff"]
+    if team is not None:
+        clauses.append("(team1_name = ? OR team2_name = ?)")
+        params += [team, team]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM matches {where} ORDER BY id", params
+        ).fetchall()
+    finally:
+        conn.close()
+    return _summaries(rows)
+
+def _decode_points(data):
+    # (point_teams, point_times, point_ms) arrays, point_ms being None for
+    # matches stored before the millisecond clock, or the list of event
+    # dicts of a match imported from the legacy pickle.
+    data = pickle.loads(data)
+    if isinstance(data, list):
+        return data
+    point_teams, point_times = array("B"), array("I")
+    point_teams.frombytes(data[0])
+    point_times.frombytes(data[1])
+    point_ms = None
+    if len(data) > 2:
+        point_ms = array("I")
+        point_ms.frombytes(data[2])
+    return point_teams, point_times, point_ms
+
+def _set_points(record, points):
+    if isinstance(points, list):
+        record["point_history"] = points
+    else:
+        record["point_teams"], record["point_times"], point_ms = points
+        if point_ms is not None:
+            record["point_ms"] = point_ms
+
+def load_points(match_id):
+    # Compact timeline of a match, or None if it only has event dicts.
+    row = _load_point_row(match_id)
+    if row is None:
+        return None
+    points = _decode_points(row[4])
+    return None if isinstance(points, list) else points[:2]
+
+def load_point_record(match_id):
+    # Everything needed to rebuild a match's timeline: team names, format,
+    # score and either the compact point_teams/point_times (and point_ms, if
+    # recorded) arrays or, for matches imported from the legacy pickle, the
+    # point_history event dicts.
+    row = _load_point_row(match_id)
+    if row is None:
+        return None
+    team1_name, team2_name, games_per_set, total_sets, data, score = row
+    record = {
+        "team1_name": team1_name,
+        "team2_name": team2_name,
+        "games_per_set": games_per_set,
+        "total_sets": total_sets,
+        "score": score,
+    }
+    _set_points(record, _decode_points(data))
+    return record
+
+def iter_point_records(batch_size=1000, conn=None):
+    # Every match, oldest first, as a summary dict extended with the
+    # load_point_record() fields. Rows are fetched batch_size at a time so
+    # the whole archive is never in memory. Reads through `conn` if given,
+    # e.g. to stay inside the caller's transaction.
+    own_conn = conn is None
+    if own_conn:
+        conn = _connect()
+    try:
+        cur = conn.execute(
+            "SELECT m.id, m.date, m.team1, m.team2, m.score, m.duration, m.team1_name,"
+            " m.team2_name, m.games_per_set, m.total_sets, m.uid, p.data"
+            " FROM matches m JOIN point_histories p ON p.match_id = m.id ORDER BY m.id"
+        )
+        keys = ("id", "date", "team1", "team2", "score", "duration", "team1_name",
+                "team2_name", "games_per_set", "total_sets", "uid")
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                record = dict(zip(keys, row))
+                _set_points(record, _decode_points(row[-1]))
+                yield record
+    finally:
+        if own_conn:
+            conn.close()
+
+def compact_points(record):
+    # point_teams/point_times of a load_point_record()/iter_point_records()
+    # record, converting the event dicts of legacy matches.
+    if "point_history" not in record:
+        return record["point_teams"], record["point_times"]
+    teams = (record["team1_name"], record["team2_name"])
+    point_teams, point_times = array("B"), array("I")
+    for event in record["point_history"]:
+        point_teams.append(teams.index(event["scoring_team"]))
+        point_times.append(parse_match_time(event["time"]))
+    return point_teams, point_times
+
+def compact_point_ms(record):
+    # Millisecond match time of every point of a record, from whole seconds
+    # for matches stored before the millisecond clock.
+    if "point_ms" in record:
+        return record["point_ms"]
+    return array("I", (seconds * 1000 for seconds in compact_points(record)[1]))
+
+def candidate_formats(games_per_set, total_sets, score):
+    # Matches imported from the legacy pickle have no recorded format; guess
+    # it from the score ("2-1 (6-4, 3-6, 7-5)"): best of 2 * sets won - 1,
+    # or of 3 when a super tiebreak decided it at 1-1, with the set scores
+    # bounding games per set. Most likely first.
+    if games_per_set and total_sets:
+        return [(int(games_per_set), int(total_sets))]
+    sets_part, _, games_part = score.partition(" (")
+    sets1, sets2 = (int(sets) for sets in sets_part.split("-"))
+    total_sets = 2 * max(sets1, sets2) - 1 if sets1 != sets2 else 2 * sets1 + 1
+    most_games = max((int(games) for set_score in games_part.rstrip(")").split(", ")
+                      for games in set_score.split("-") if games), default=6)
+    formats = [(6, total_sets)]
+    formats += [(games_per_set, total_sets) for games_per_set in (most_games, most_games - 1)
+                if games_per_set > 0 and games_per_set != 6]
+    return formats
+
+def load_point_history(match_id):
+    row = _load_point_row(match_id)
+    if row is None:
+        return []
+    team1_name, team2_name, games_per_set, total_sets, data, _ = row
+    points = _decode_points(data)
+    if isinstance(points, list):
+        return points
+    return build_point_history(team1_name, team2_name, games_per_set, total_sets, *points[:2])
+
+def _load_point_row(match_id):
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT m.team1_name, m.team2_name, m.games_per_set, m.total_sets, p.data, m.score"
+            " FROM matches m JOIN point_histories p ON p.match_id = m.id WHERE m.id = ?",
+            (match_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+def store_seek_index(match_id, seek_index):
+    # Keep the first index stored for a match; they never change.
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO seek_indexes (match_id, data) VALUES (?, ?)",
+                         (match_id, pickle.dumps(seek_index)))
+    finally:
+        conn.close()
+
+def load_seek_index(match_id):
+    # The seek index stored for a match, or None.
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT data FROM seek_indexes WHERE match_id = ?", (match_id,)).fetchone()
+    finally:
+        conn.close()
+    return None if row is None else pickle.loads(row[0])
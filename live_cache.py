@@ -0,0 +1,81 @@
+import threading
+import time
+
+import court_registry
+import history_store
+import scoreboard
+import state_manager
+
+# Board state shared by every session of the Streamlit process. However many
+# displays are open, each court's state is decoded and its scoreboard built
+# once per state version; viewers only read the cached entries.
+
+# Seconds between checks of a court's state version; viewers polling in
+# between reuse the last check, so disk stats do not grow with viewers.
+VERSION_CHECK_INTERVAL = 0.25
+
+_lock = threading.Lock()
+_court_locks = {}
+# court_id -> {"version", "checked", "match", "html": {lang: html}}
+_boards = {}
+# Shared entries for the history table and all-courts overview.
+_shared = {}
+
+def _court_lock(court_id):
+    with _lock:
+        return _court_locks.setdefault(court_id, threading.Lock())
+
+def _board_entry(court_id):
+    entry = _boards.get(court_id)
+    now = time.monotonic()
+    if entry is None or now - entry["checked"] >= VERSION_CHECK_INTERVAL:
+        with _court_lock(court_id):
+            entry = _boards.get(court_id)
+            if entry is None or now - entry["checked"] >= VERSION_CHECK_INTERVAL:
+                version = state_manager.state_version(court_id)
+                if entry is None or entry["version"] != version:
+                    # Only the first viewer to see a new version decodes it.
+                    entry = {"version": version, "match": state_manager.load_state(court_id), "html": {}}
+                entry["checked"] = time.monotonic()
+                _boards[court_id] = entry
+    return entry
+
+def board(court_id, lang):
+    # (match, scoreboard html) of a court's current state. The match is
+    # shared with other sessions and must be treated as read-only.
+    entry = _board_entry(court_id)
+    html = entry["html"].get(lang)
+    if html is None:
+        html = entry["html"][lang] = scoreboard.build_scoreboard_html(entry["match"], lang)
+    return entry["match"], html
+
+def _shared_value(key, version, build):
+    entry = _shared.get(key)
+    if entry is None or entry[0] != version:
+        with _court_lock(key):
+            entry = _shared.get(key)
+            if entry is None or entry[0] != version:
+                entry = _shared[key] = (version, build())
+    return entry[1]
+
+def history_table(n):
+    # Table HTML of the n latest matches, or None with no history; rebuilt
+    # only when the history database changes.
+    def build():
+        entries = history_store.latest(n)
+        return scoreboard.build_history_table(entries) if entries else None
+    return _shared_value(("history", n), history_store.history_version(), build)
+
+def courts_table(lang):
+    # All-courts overview HTML. Its clocks tick every second, so it is
+    # rebuilt at most once a second whatever the number of viewers.
+    # The rows come from each court's own state, decoded once per version
+    # and shared with that court's board.
+    def build():
+        courts = []
+        for court_id in sorted(court_registry.list_courts()):
+            match = _board_entry(court_id)["match"]
+            if match is not None:
+                courts.append(court_registry.overview_row(court_id, match))
+        return scoreboard.build_courts_table(courts, lang)
+    return _shared_value(("courts", lang), int(time.time()), build)
@@ -1,6 +1,26 @@
 import datetime
+import time
+import uuid
+from array import array
+
+import metrics
+
+# Point names of a regular game, indexed by points won.
+REGULAR_SCORE_NAMES = ("0", "15", "30", "40")
 
 class Match:
+    # The scoring core keeps per-team counters in two-element lists indexed by
+    # team (0 = team1, 1 = team2) and updates them in place, so scoring a
+    # point allocates nothing. The name-keyed attributes (points, games_won,
+    # sets_won, winner, ...) are views built from the core on access.
+    __slots__ = (
+        "team1_name", "team2_name", "games_per_set", "total_sets", "start_time",
+        "_sets", "_games", "_points", "game_mode", "match_over", "_winner",
+        "set_history", "point_teams", "point_times", "_point_history",
+        "_last_game_winner", "_last_set_winner", "added_to_history",
+        "_checkpoints", "_redo", "uid", "point_ms", "_clock_ms", "_clock_resumed",
+    )
+
     def __init__(self, team1_name, team2_name, games_per_set=6, total_sets=3):
         self.team1_name = team1_name
         self.team2_name = team2_name
@@ -8,14 +28,11 @@ class Match:
         self.total_sets = total_sets  # e.g., 3 means best-of-3 (first to 2 sets)
         self.start_time = datetime.datetime.now()
 
-        # Track sets won by each team.
-        self.sets_won = {team1_name: 0, team2_name: 0}
-
-        # Track games (in the current set) won by each team.
-        self.games_won = {team1_name: 0, team2_name: 0}
-
-        # Points (in the current game) for each team.
-        self.points = {team1_name: 0, team2_name: 0}
+        # Sets won, games won in the current set and points in the current
+        # game, per team index.
+        self._sets = [0, 0]
+        self._games = [0, 0]
+        self._points = [0, 0]
 
         # Game mode can be:
         # "regular" – standard game with tennis point names,
@@ -23,153 +40,443 @@ class Match:
         # "super_tiebreak" – used if sets are split (for best-of-3).
         self.game_mode = "regular"
 
-        # Flag to indicate if the match is over.
+        # Flag to indicate if the match is over; _winner is a team index.
         self.match_over = False
-        self.winner = None
+        self._winner = None
 
         # Record finished set scores as tuples (team1_games, team2_games)
         self.set_history = []
 
-        # Record every point event.
-        self.point_history = []
+        # Record every point compactly: the scoring team index (0 or 1) and
+        # the elapsed match time in whole seconds. The per-point event dicts
+        # of `point_history` are rebuilt from these on demand.
+        self.point_teams = array("B")
+        self.point_times = array("I")
+        self._point_history = None
+        # The same match times in milliseconds, for timing analysis.
+        self.point_ms = array("I")
+
+        # Match clock: milliseconds of play up to the last resume, and the
+        # monotonic time (ms) of that resume, or None while paused. Pauses
+        # do not count as match time; the clock stops at the last point.
+        # Pickles hold the resume as wall-clock time instead (see
+        # __getstate__).
+        self._clock_ms = 0
+        self._clock_resumed = _monotonic_ms()
 
-        # New: track who won the last closed game and set.
-        self.last_game_winner = None
-        self.last_set_winner = None
+        # Team index of who won the last closed game and set.
+        self._last_game_winner = None
+        self._last_set_winner = None
 
         # Flag so that a finished match is added only once to history.
         self.added_to_history = False
 
-    def add_point(self, team):
+        # (points played, core state) at the start and after every closed
+        # game, for undo; undone (team index, milliseconds) points, for redo.
+        self._checkpoints = [(0, self._core_state())]
+        self._redo = []
+
+        # Identifies this match in the history, so it is stored only once.
+        self.uid = uuid.uuid4().hex
+
+    def add_point(self, team, elapsed=None):
+        # `elapsed` (a timedelta) stamps the event with a known match time,
+        # e.g. when replaying a journal; by default the match clock is used,
+        # and a point scored during a pause ends it.
+        if team == self.team1_name:
+            self.add_point_index(0, elapsed)
+        elif team == self.team2_name:
+            self.add_point_index(1, elapsed)
+
+    @metrics.timed("match.add_point")
+    def add_point_index(self, team_index, elapsed=None):
         if self.match_over:
             return
-        if team not in [self.team1_name, self.team2_name]:
-            return
+        if elapsed is None:
+            self.resume()
+            # Never before the previous point, whatever the clock was given.
+            ms = max(self.elapsed_ms(), self.point_ms[-1] if self.point_ms else 0)
+        else:
+            ms = round(elapsed.total_seconds() * 1000)
+        if self._redo:
+            self._redo.clear()
+        self._record_point(team_index, ms)
 
-        if self.game_mode == "regular":
-            self._add_point_regular(team)
-        elif self.game_mode == "tiebreak":
-            self._add_point_tiebreak(team)
-        elif self.game_mode == "super_tiebreak":
-            self._add_point_super_tiebreak(team)
-        self._check_game_over()
-        
-        # Log the point event.
-        event = {
-            "time": self.get_match_time(),
-            "scoring_team": team,
-            "current_game_score": self.get_current_game_score(),
-            "current_set_score": self.games_won.copy(),
-            "current_match_score": self.sets_won.copy()
-        }
-        self.point_history.append(event)
-
-    def _add_point_regular(self, team):
-        self.points[team] += 1
-
-    def _add_point_tiebreak(self, team):
-        self.points[team] += 1
-
-    def _add_point_super_tiebreak(self, team):
-        self.points[team] += 1
+    def _record_point(self, team_index, ms):
+        self._score_point(team_index)
+        self.point_teams.append(team_index)
+        self.point_times.append(ms // 1000)
+        self.point_ms.append(ms)
+        self._point_history = None
+        points = self._points
+        if (points[0] == 0 and points[1] == 0) or self.match_over:
+            self._checkpoints.append((len(self.point_teams), self._core_state()))
+        if self.match_over:
+            self._clock_ms = ms
+            self._clock_resumed = None
+
+    def elapsed_ms(self):
+        # Match time in milliseconds, without pauses.
+        if self._clock_resumed is None:
+            return self._clock_ms
+        return self._clock_ms + max(_monotonic_ms() - self._clock_resumed, 0)
+
+    @property
+    def paused(self):
+        return self._clock_resumed is None and not self.match_over
+
+    def pause(self):
+        # Stop the match clock, e.g. for a break. Returns False if it was
+        # already stopped.
+        if self._clock_resumed is None:
+            return False
+        self._clock_ms = self.elapsed_ms()
+        self._clock_resumed = None
+        return True
+
+    def resume(self):
+        # Restart the match clock after a pause. Returns False if it was
+        # running or the match is over.
+        if self._clock_resumed is not None or self.match_over:
+            return False
+        self._clock_resumed = _monotonic_ms()
+        return True
+
+    def undo(self):
+        # Take back the last point: restore the last checkpoint before it and
+        # replay the points of the current game. Returns False if there was
+        # nothing to undo.
+        if not self.point_teams:
+            return False
+        was_over = self.match_over
+        self.point_times.pop()
+        self._redo.append((self.point_teams.pop(), self.point_ms.pop()))
+        point_count = len(self.point_teams)
+        checkpoints = self._checkpoints
+        while checkpoints[-1][0] > point_count:
+            checkpoints.pop()
+        checkpoint_index, core_state = checkpoints[-1]
+        self._restore_core_state(core_state)
+        for team_index in self.point_teams[checkpoint_index:]:
+            self._score_point(team_index)
+        self._point_history = None
+        if was_over:
+            # Taking back the final point restarts the clock where it stopped.
+            self.resume()
+        return True
+
+    def redo(self):
+        # Score the last undone point again. Returns False if there was
+        # nothing to redo; scoring a new point discards the redo stack.
+        if not self._redo or self.match_over:
+            return False
+        self._record_point(*self._redo.pop())
+        return True
+
+    @property
+    def can_undo(self):
+        return len(self.point_teams) > 0
+
+    @property
+    def can_redo(self):
+        return len(self._redo) > 0 and not self.match_over
+
+    def _core_state(self):
+        return (
+            self._sets[0], self._sets[1], self._games[0], self._games[1],
+            self._points[0], self._points[1], self.game_mode, self.match_over,
+            self._winner, len(self.set_history), self._last_game_winner,
+            self._last_set_winner,
+        )
+
+    def _restore_core_state(self, core_state):
+        (
+            self._sets[0], self._sets[1], self._games[0], self._games[1],
+            self._points[0], self._points[1], self.game_mode, self.match_over,
+            self._winner, set_count, self._last_game_winner,
+            self._last_set_winner,
+        ) = core_state
+        del self.set_history[set_count:]
+
+    def _score_point(self, team_index):
+        points = self._points
+        points[team_index] += 1
+        # No game mode can close a game before a team reaches 4 points.
+        if points[team_index] >= 4:
+            self._check_game_over()
 
     def _check_game_over(self):
+        pts1, pts2 = self._points
         if self.game_mode == "regular":
-            pts1 = self.points[self.team1_name]
-            pts2 = self.points[self.team2_name]
             if (pts1 >= 4 or pts2 >= 4):
                 if pts1 >= 4 and pts1 - pts2 >= 1 and pts2 < 3:
-                    self._game_won(self.team1_name)
+                    self._game_won(0)
                 elif pts2 >= 4 and pts2 - pts1 >= 1 and pts1 < 3:
-                    self._game_won(self.team2_name)
+                    self._game_won(1)
                 elif pts1 >= 3 and pts2 >= 3 and pts1 != pts2:
-                    winner = self.team1_name if pts1 > pts2 else self.team2_name
-                    self._game_won(winner)
+                    self._game_won(0 if pts1 > pts2 else 1)
         elif self.game_mode == "tiebreak":
-            pts1 = self.points[self.team1_name]
-            pts2 = self.points[self.team2_name]
             if (pts1 >= 7 or pts2 >= 7) and abs(pts1 - pts2) >= 2:
-                winner = self.team1_name if pts1 > pts2 else self.team2_name
-                self._game_won(winner, is_tiebreak=True)
+                self._game_won(0 if pts1 > pts2 else 1, is_tiebreak=True)
         elif self.game_mode == "super_tiebreak":
-            pts1 = self.points[self.team1_name]
-            pts2 = self.points[self.team2_name]
             if (pts1 >= 10 or pts2 >= 10) and abs(pts1 - pts2) >= 2:
-                winner = self.team1_name if pts1 > pts2 else self.team2_name
-                self._match_won(winner)
+                self._match_won(0 if pts1 > pts2 else 1)
 
     def _game_won(self, winner, is_tiebreak=False):
+        points = self._points
+        points[0] = points[1] = 0
         if is_tiebreak:
             # In a tie-break, the winner closes the set.
-            self.points = {self.team1_name: 0, self.team2_name: 0}
-            self.games_won = {self.team1_name: 0, self.team2_name: 0}
+            games = self._games
+            games[0] = games[1] = 0
             self._set_won(winner)
             self.game_mode = "regular"
         else:
             # Record last closed game winner.
-            self.last_game_winner = winner
-            self.games_won[winner] += 1
-            self.points = {self.team1_name: 0, self.team2_name: 0}
+            self._last_game_winner = winner
+            self._games[winner] += 1
             self._check_set_over()
 
     def _check_set_over(self):
-        pts1 = self.games_won[self.team1_name]
-        pts2 = self.games_won[self.team2_name]
+        pts1, pts2 = self._games
         if (pts1 >= self.games_per_set or pts2 >= self.games_per_set):
             if abs(pts1 - pts2) >= 2:
-                winner = self.team1_name if pts1 > pts2 else self.team2_name
-                self._set_won(winner)
+                self._set_won(0 if pts1 > pts2 else 1)
             elif pts1 == pts2 and pts1 == self.games_per_set:
                 self.game_mode = "tiebreak"
 
     def _set_won(self, winner):
+        games = self._games
+        sets = self._sets
         # Record the finished set score.
-        self.set_history.append((
-            self.games_won[self.team1_name],
-            self.games_won[self.team2_name]
-        ))
-        self.last_set_winner = winner
-        self.sets_won[winner] += 1
-        self.games_won = {self.team1_name: 0, self.team2_name: 0}
-        self.points = {self.team1_name: 0, self.team2_name: 0}
-        
+        self.set_history.append((games[0], games[1]))
+        self._last_set_winner = winner
+        sets[winner] += 1
+        games[0] = games[1] = 0
+        points = self._points
+        points[0] = points[1] = 0
+
         if self.total_sets == 3:
-            if self.sets_won[winner] == 2:
+            if sets[winner] == 2:
                 self._match_won(winner)
             else:
-                if (self.sets_won[self.team1_name] == 1 and 
-                    self.sets_won[self.team2_name] == 1):
+                if sets[0] == 1 and sets[1] == 1:
                     self.game_mode = "super_tiebreak"
         else:
             needed = self.total_sets // 2 + 1
-            if self.sets_won[winner] == needed:
+            if sets[winner] == needed:
                 self._match_won(winner)
 
     def _match_won(self, winner):
         self.match_over = True
-        self.winner = winner
+        self._winner = winner
 
-    def get_current_game_score(self):
+    def _team_name(self, team_index):
+        if team_index is None:
+            return None
+        return self.team2_name if team_index else self.team1_name
+
+    @property
+    def winner(self):
+        return self._team_name(self._winner)
+
+    @property
+    def last_game_winner(self):
+        return self._team_name(self._last_game_winner)
+
+    @property
+    def last_set_winner(self):
+        return self._team_name(self._last_set_winner)
+
+    @property
+    def last_point_team(self):
+        if not self.point_teams:
+            return None
+        return self._team_name(self.point_teams[-1])
+
+    @property
+    def points(self):
+        return {self.team1_name: self._points[0], self.team2_name: self._points[1]}
+
+    @property
+    def games_won(self):
+        return {self.team1_name: self._games[0], self.team2_name: self._games[1]}
+
+    @property
+    def sets_won(self):
+        return {self.team1_name: self._sets[0], self.team2_name: self._sets[1]}
+
+    @property
+    def point_history(self):
+        # Event dicts for every point, rebuilt by replaying the match.
+        if self._point_history is None:
+            self._point_history = build_point_history(
+                self.team1_name, self.team2_name, self.games_per_set, self.total_sets,
+                self.point_teams, self.point_times
+            )
+        return self._point_history
+
+    def game_points(self):
+        # Displayed points of the current game by team index, which stays
+        # right when both teams have the same name.
+        pts1, pts2 = self._points
         if self.game_mode == "regular":
-            score_map = {0: "0", 1: "15", 2: "30", 3: "40"}
-            pts1 = self.points[self.team1_name]
-            pts2 = self.points[self.team2_name]
-            return {
-                self.team1_name: score_map.get(pts1, pts1),
-                self.team2_name: score_map.get(pts2, pts2)
-            }
-        else:
-            return {
-                self.team1_name: self.points[self.team1_name],
-                self.team2_name: self.points[self.team2_name]
-            }
+            pts1 = REGULAR_SCORE_NAMES[pts1] if pts1 < 4 else pts1
+            pts2 = REGULAR_SCORE_NAMES[pts2] if pts2 < 4 else pts2
+        return pts1, pts2
+
+    def get_current_game_score(self):
+        pts1, pts2 = self.game_points()
+        return {self.team1_name: pts1, self.team2_name: pts2}
 
     def get_set_score(self):
         return {"sets": self.sets_won, "games": self.games_won}
 
-    def get_match_time(self):
-        elapsed = datetime.datetime.now() - self.start_time
+    def get_match_time(self, elapsed=None):
+        if elapsed is None:
+            elapsed = datetime.timedelta(milliseconds=self.elapsed_ms())
         return str(elapsed).split(".")[0]
 
     def reset(self):
-        self.__init__(self.team1_name, self.team2_name, self.games_per_set, self.total_sets)
\ No newline at end of file
+        self.__init__(self.team1_name, self.team2_name, self.games_per_set, self.total_sets)
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["_point_history"] = None
+        if self._clock_resumed is not None:
+            # Monotonic time means nothing after a restart or on another
+            # host, so a running clock is saved with the wall-clock time of
+            # its resume.
+            state["_clock_resumed"] = None
+            state["_clock_resumed_wall"] = _wall_ms() - (_monotonic_ms() - self._clock_resumed)
+        return state
+
+    def __setstate__(self, state):
+        if "points" in state:
+            state = _convert_legacy_state(state)
+        state = dict(state)
+        resumed_wall = state.pop("_clock_resumed_wall", None)
+        for name, value in state.items():
+            setattr(self, name, value)
+        if resumed_wall is not None:
+            self._clock_resumed = _monotonic_ms() - max(_wall_ms() - resumed_wall, 0)
+        elif "point_ms" in state and self._clock_resumed is not None:
+            # Pickled with a monotonic resume time, which may come from
+            # before a restart: run the clock on from the last point.
+            self._clock_ms = max(self._clock_ms, self.point_ms[-1] if self.point_ms else 0)
+            self._clock_resumed = _monotonic_ms()
+        if "point_ms" not in state:
+            # Pickled before the millisecond clock: the match ran from its
+            # start time, or stopped at its last point.
+            self.point_ms = array("I", (seconds * 1000 for seconds in self.point_times))
+            self._redo = [(team_index, seconds * 1000) for team_index, seconds in state.get("_redo", [])]
+            if self.match_over:
+                self._clock_ms = self.point_ms[-1] if self.point_ms else 0
+                self._clock_resumed = None
+            else:
+                elapsed = datetime.datetime.now() - self.start_time
+                self._clock_ms = max(round(elapsed.total_seconds() * 1000), 0)
+                self._clock_resumed = _monotonic_ms()
+        if "_checkpoints" not in state:
+            # Pickled before undo existed: rebuild the checkpoints by replay.
+            replay = Match(self.team1_name, self.team2_name, self.games_per_set, self.total_sets)
+            for team_index, ms in zip(self.point_teams, self.point_ms):
+                replay._record_point(team_index, ms)
+            self._checkpoints = replay._checkpoints
+            self._redo = []
+        if "uid" not in state:
+            # Pickled before matches had ids: derive a stable one.
+            self.uid = f"{self.start_time.isoformat()} {self.team1_name} {self.team2_name}"
+
+def _monotonic_ms():
+    return time.monotonic_ns() // 1_000_000
+
+def _wall_ms():
+    return time.time_ns() // 1_000_000
+
+def _convert_legacy_state(state):
+    # Matches pickled by earlier versions kept name-keyed dicts and, before
+    # that, a list of point event dicts.
+    teams = (state["team1_name"], state["team2_name"])
+
+    def index(name):
+        return None if name is None else teams.index(name)
+
+    converted = {
+        "team1_name": teams[0],
+        "team2_name": teams[1],
+        "games_per_set": state["games_per_set"],
+        "total_sets": state["total_sets"],
+        "start_time": state["start_time"],
+        "_sets": [state["sets_won"][team] for team in teams],
+        "_games": [state["games_won"][team] for team in teams],
+        "_points": [state["points"][team] for team in teams],
+        "game_mode": state["game_mode"],
+        "match_over": state["match_over"],
+        "_winner": index(state["winner"]),
+        "set_history": state["set_history"],
+        "_point_history": None,
+        "_last_game_winner": index(state.get("last_game_winner")),
+        "_last_set_winner": index(state.get("last_set_winner")),
+        "added_to_history": state.get("added_to_history", False),
+    }
+    if "point_history" in state:
+        converted["point_teams"] = array("B", (
+            index(event["scoring_team"]) for event in state["point_history"]
+        ))
+        converted["point_times"] = array("I", (
+            parse_match_time(event["time"]) for event in state["point_history"]
+        ))
+    else:
+        converted["point_teams"] = state["point_teams"]
+        converted["point_times"] = state["point_times"]
+    return converted
+
+def parse_match_time(match_time):
+    # Inverse of Match.get_match_time: "H:MM:SS" (or "N days, H:MM:SS") to seconds.
+    days = 0
+    if "," in match_time:
+        day_part, match_time = match_time.split(",")
+        days = int(day_part.split()[0])
+    hours, minutes, seconds = (int(part) for part in match_time.split(":"))
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+def build_point_history(team1_name, team2_name, games_per_set, total_sets, point_teams, point_times):
+    # Expand compact point arrays into the per-point event dicts by replaying
+    # the scoring rules.
+    replay = Match(team1_name, team2_name, games_per_set, total_sets)
+    teams = (team1_name, team2_name)
+    history = []
+    for team_index, seconds in zip(point_teams, point_times):
+        replay._score_point(team_index)
+        history.append({
+            "time": replay.get_match_time(datetime.timedelta(seconds=seconds)),
+            "scoring_team": teams[team_index],
+            "current_game_score": replay.get_current_game_score(),
+            "current_set_score": replay.games_won,
+            "current_match_score": replay.sets_won
+        })
+    return history
+
+def replay_score_columns(games_per_set, total_sets, point_teams):
+    # The score after every point, gathered column by column: displayed game
+    # points, games and sets for each team.
+    replay = Match("", "", games_per_set, total_sets)
+    points, games, sets = replay._points, replay._games, replay._sets
+    columns = {key: [] for key in ("points1", "points2", "games1", "games2", "sets1", "sets2")}
+    points1, points2 = columns["points1"], columns["points2"]
+    games1, games2 = columns["games1"], columns["games2"]
+    sets1, sets2 = columns["sets1"], columns["sets2"]
+    for team_index in point_teams:
+        replay._score_point(team_index)
+        if replay.game_mode == "regular":
+            points1.append(REGULAR_SCORE_NAMES[points[0]] if points[0] < 4 else points[0])
+            points2.append(REGULAR_SCORE_NAMES[points[1]] if points[1] < 4 else points[1])
+        else:
+            points1.append(points[0])
+            points2.append(points[1])
+        games1.append(games[0])
+        games2.append(games[1])
+        sets1.append(sets[0])
+        sets2.append(sets[1])
+    return columns
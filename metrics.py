@@ -0,0 +1,113 @@
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# Timing spans around the hot paths, aggregated per span name into a count,
+# total, maximum and latency histogram. Off unless SCOREBOARD_METRICS is set;
+# then timed() leaves functions undecorated and span() hands out one shared
+# no-op context manager, so disabled instrumentation costs next to nothing.
+ENABLED = os.environ.get("SCOREBOARD_METRICS", "") not in ("", "0")
+
+# Prometheus text file, for node_exporter's textfile collector or any
+# scraper reading files.
+METRICS_FILE = os.environ.get("SCOREBOARD_METRICS_FILE", "metrics.prom")
+# Minimum seconds between two writes of METRICS_FILE.
+TEXTFILE_INTERVAL = 10
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_lock = threading.Lock()
+# span name -> [count, total seconds, max seconds, per-bucket counts]
+_series = {}
+_last_textfile_write = 0.0
+
+_NO_SPAN = contextlib.nullcontext()
+
+def observe(name, seconds):
+    with _lock:
+        series = _series.get(name)
+        if series is None:
+            series = _series[name] = [0, 0.0, 0.0, [0] * (len(BUCKETS) + 1)]
+        series[0] += 1
+        series[1] += seconds
+        if seconds > series[2]:
+            series[2] = seconds
+        series[3][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+def span(name):
+    # with metrics.span("page.score_board"): ...
+    return _Span(name) if ENABLED else _NO_SPAN
+
+def timed(name):
+    # Decorator timing every call of a function as span `name`.
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def summary():
+    # {span name: {"count", "total", "mean", "max"}} in seconds, by name.
+    with _lock:
+        series = {name: list(values[:3]) for name, values in _series.items()}
+    return {
+        name: {"count": count, "total": total, "mean": total / count, "max": maximum}
+        for name, (count, total, maximum) in sorted(series.items())
+    }
+
+def render_prometheus():
+    with _lock:
+        series = {name: (values[0], values[1], list(values[3])) for name, values in _series.items()}
+    lines = [
+        "# HELP scoreboard_span_seconds Time spent in instrumented code paths.",
+        "# TYPE scoreboard_span_seconds histogram",
+    ]
+    for name, (count, total, buckets) in sorted(series.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + ("+Inf",), buckets):
+            cumulative += bucket_count
+            lines.append(f'scoreboard_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'scoreboard_span_seconds_sum{{span="{name}"}} {total}')
+        lines.append(f'scoreboard_span_seconds_count{{span="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path=METRICS_FILE, force=False):
+    # Write the metrics to `path`, at most every TEXTFILE_INTERVAL seconds
+    # unless forced. Replaced atomically so scrapers never read half a file.
+    global _last_textfile_write
+    if not ENABLED:
+        return
+    now = time.monotonic()
+    if not force and now - _last_textfile_write < TEXTFILE_INTERVAL:
+        return
+    _last_textfile_write = now
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(temp_path, path)
@@ -0,0 +1,149 @@
+import argparse
+from collections import deque
+
+import history_store
+from match import Match
+
+# Point timing from the per-point millisecond match clock: time between
+# points (overall and over the last few points), game and set durations and
+# the pace of play over the match. PointTimer is fed one point at a time, so
+# a live court updates it as points are scored; history_timing() runs it
+# over the whole history for court-time planning.
+#
+#   python point_timing.py
+
+# Points in the rolling time-between-points window.
+ROLLING_POINTS = 10
+# Width of the pace windows (points per minute over the match), in ms.
+PACE_WINDOW_MS = 5 * 60 * 1000
+
+class PointTimer:
+
+    def __init__(self, games_per_set, total_sets, rolling_points=ROLLING_POINTS):
+        # Scores the points to find where games and sets end.
+        self._match = Match("", "", games_per_set, total_sets)
+        self._recent_gaps = deque(maxlen=rolling_points)
+        # uid of the Match timed, when fed by match_timer/advance_timer.
+        self.match_uid = None
+        self.points = 0
+        self.last_ms = 0
+        self.game_start_ms = 0
+        self.set_start_ms = 0
+        self.game_durations = []
+        self.set_durations = []
+        # Points scored in each PACE_WINDOW_MS window of match time.
+        self.pace_counts = []
+
+    def add(self, team_index, ms):
+        # Account for a point scored by `team_index` at match time `ms`.
+        match = self._match
+        sets_before = len(match.set_history)
+        match._score_point(team_index)
+        self._recent_gaps.append(ms - self.last_ms)
+        self.points += 1
+        self.last_ms = ms
+        window = ms // PACE_WINDOW_MS
+        if window >= len(self.pace_counts):
+            self.pace_counts.extend([0] * (window + 1 - len(self.pace_counts)))
+        self.pace_counts[window] += 1
+        points = match._points
+        if (points[0] == 0 and points[1] == 0) or match.match_over:
+            self.game_durations.append(ms - self.game_start_ms)
+            self.game_start_ms = ms
+        if len(match.set_history) != sets_before or match.match_over:
+            # A super tiebreak ends the match without adding a set score.
+            self.set_durations.append(ms - self.set_start_ms)
+            self.set_start_ms = ms
+
+    def summary(self):
+        # Timings in milliseconds (mean_gap_ms is None before any point);
+        # pace is [(window start in minutes, points per minute), ...].
+        window_minutes = PACE_WINDOW_MS / 60000
+        return {
+            "points": self.points,
+            "elapsed_ms": self.last_ms,
+            "mean_gap_ms": self.last_ms / self.points if self.points else None,
+            "rolling_gap_ms": (sum(self._recent_gaps) / len(self._recent_gaps)
+                               if self._recent_gaps else None),
+            "game_durations_ms": list(self.game_durations),
+            "set_durations_ms": list(self.set_durations),
+            "pace": [(index * window_minutes, count / window_minutes)
+                     for index, count in enumerate(self.pace_counts)],
+        }
+
+def match_timer(match, rolling_points=ROLLING_POINTS):
+    # PointTimer over the points of a Match so far.
+    return advance_timer(None, match, rolling_points)
+
+def advance_timer(timer, match, rolling_points=ROLLING_POINTS):
+    # `timer` brought up to date with `match` by adding only the points
+    # scored since; a new timer if `timer` is None, timed another match or
+    # has points that were since undone.
+    points = timer.points if timer is not None else 0
+    if (timer is None or timer.match_uid != match.uid or points > len(match.point_ms)
+            or (points and match.point_ms[points - 1] != timer.last_ms)):
+        timer = PointTimer(match.games_per_set, match.total_sets, rolling_points)
+        timer.match_uid = match.uid
+    for index in range(timer.points, len(match.point_ms)):
+        timer.add(match.point_teams[index], match.point_ms[index])
+    return timer
+
+def record_timer(record, rolling_points=ROLLING_POINTS):
+    # PointTimer over a load_point_record()/iter_point_records() record;
+    # matches without a recorded format get the likeliest one.
+    games_per_set, total_sets = history_store.candidate_formats(
+        record["games_per_set"], record["total_sets"], record["score"])[0]
+    timer = PointTimer(games_per_set, total_sets, rolling_points)
+    point_teams, _ = history_store.compact_points(record)
+    for team_index, ms in zip(point_teams, history_store.compact_point_ms(record)):
+        timer.add(team_index, ms)
+    return timer
+
+def history_timing(records=None):
+    # Mean timings per match format over the history (or over `records`),
+    # streamed one match at a time: {(games_per_set, total_sets): {"matches",
+    # "points", "mean_gap_ms", "mean_game_ms", "mean_set_ms", "mean_match_ms"}}.
+    totals = {}
+    for record in history_store.iter_point_records() if records is None else records:
+        timer = record_timer(record)
+        if not timer.points:
+            continue
+        key = history_store.candidate_formats(record["games_per_set"], record["total_sets"],
+                                              record["score"])[0]
+        total = totals.setdefault(key, [0, 0, 0, 0, 0, 0, 0])
+        total[0] += 1
+        total[1] += timer.points
+        total[2] += timer.last_ms
+        total[3] += len(timer.game_durations)
+        total[4] += sum(timer.game_durations)
+        total[5] += len(timer.set_durations)
+        total[6] += sum(timer.set_durations)
+    return {
+        key: {
+            "matches": matches,
+            "points": points,
+            "mean_gap_ms": match_ms / points,
+            "mean_game_ms": game_ms / games if games else None,
+            "mean_set_ms": set_ms / sets if sets else None,
+            "mean_match_ms": match_ms / matches,
+        }
+        for key, (matches, points, match_ms, games, game_ms, sets, set_ms) in sorted(totals.items())
+    }
+
+def _format_ms(ms):
+    if ms is None:
+        return "-"
+    seconds = round(ms / 1000)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Mean point, game, set and match durations per format over the match history.")
+    parser.parse_args()
+    print(f"{'format':>8} {'matches':>8} {'points':>8} {'point':>8} {'game':>8} {'set':>8} {'match':>8}")
+    for (games_per_set, total_sets), timing in history_timing().items():
+        print(f"{f'{games_per_set}g/{total_sets}s':>8} {timing['matches']:8} {timing['points']:8}"
+              f" {timing['mean_gap_ms'] / 1000:7.1f}s {_format_ms(timing['mean_game_ms']):>8}"
+              f" {_format_ms(timing['mean_set_ms']):>8} {_format_ms(timing['mean_match_ms']):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import csv
+import itertools
+import os
+import pickle
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import archive
+import history_store
+from match import Match, parse_match_time
+from state_manager import history_entry
+
+# Re-score point logs through the Match rules: the stored history, an
+# archive directory (archive.py layout, e.g. from a partner club) or a
+# match_history.pkl from earlier versions. Each match is replayed, its
+# recorded score checked against the replayed one, and a corrected summary
+# written per match. Batches of matches are replayed in a process pool, with
+# a bounded number in flight, so memory stays flat however big the input.
+#
+#   python rescore.py history --output rescored.csv
+#   python rescore.py archive partner_archive/ --games-per-set 4 --total-sets 1
+#   python rescore.py legacy match_history.pkl --workers 8
+
+# Matches replayed per worker task.
+BATCH_SIZE = 500
+# Matches between progress reports.
+PROGRESS_EVERY = 10000
+# (games_per_set, total_sets) tried for entries whose score gives no format.
+FALLBACK_FORMATS = ((6, 3), (6, 1), (4, 3), (4, 1))
+
+OUTPUT_COLUMNS = ("source_id", "date", "team1_name", "team2_name", "games_per_set", "total_sets",
+                  "recorded_score", "score", "winner", "duration", "points_played", "status", "message")
+
+# Result statuses: the recorded score is right; it was wrong (or missing)
+# and `score` holds the replayed one; the points do not finish the match;
+# the log cannot be replayed.
+OK = "ok"
+CORRECTED = "corrected"
+UNFINISHED = "unfinished"
+INVALID = "invalid"
+
+def _record(source_id, date, team1_name, team2_name, games_per_set, total_sets, score,
+            winner, point_teams=None, point_ms=None, error=None):
+    # Common form of a log entry from any source. `winner` is 1, 2 or None;
+    # `error` is set when the entry could not be read.
+    return {
+        "source_id": source_id, "date": date, "team1_name": team1_name, "team2_name": team2_name,
+        "games_per_set": games_per_set, "total_sets": total_sets, "score": score, "winner": winner,
+        "point_teams": point_teams, "point_ms": point_ms, "error": error,
+    }
+
+def _winner_from_names(team1, team2):
+    if team1.endswith(" 🎾"):
+        return 1
+    if team2.endswith(" 🎾"):
+        return 2
+    return None
+
+def history_records():
+    for record in history_store.iter_point_records():
+        # Legacy matches may name a scoring team that is not one of theirs,
+        # or miss an event's team or time.
+        try:
+            point_teams, _ = history_store.compact_points(record)
+            point_ms = history_store.compact_point_ms(record)
+            error = None
+        except (KeyError, ValueError) as e:
+            point_teams = point_ms = None
+            error = f"unreadable point history: {e!r}"
+        yield _record(record["id"], record["date"], record["team1_name"], record["team2_name"],
+                      record["games_per_set"], record["total_sets"], record["score"],
+                      _winner_from_names(record["team1"], record["team2"]),
+                      point_teams, point_ms, error)
+
+def archive_records(directory):
+    for row, points in archive.iter_archive(directory):
+        try:
+            point_teams = array("B", (int(point["team"]) - 1 for point in points))
+            point_ms = array("I", (int(point["ms"]) if point.get("ms") else int(point["seconds"]) * 1000
+                                   for point in points))
+            error = None
+        except (ValueError, OverflowError) as e:
+            point_teams = point_ms = None
+            error = f"unreadable point: {e}"
+        yield _record(row["match_id"], row["date"], row["team1_name"], row["team2_name"],
+                      row["games_per_set"], row["total_sets"], row["score"],
+                      int(row["winner"]) if row["winner"] else None, point_teams, point_ms, error)
+
+def legacy_records(path):
+    # Entries of a match_history.pkl: summary fields and a point_history of
+    # event dicts with the scoring team's name and an "H:MM:SS" time.
+    with open(path, "rb") as f:
+        history = pickle.load(f)
+    for number, entry in enumerate(history, 1):
+        team1 = entry.get("team1", "")
+        team2 = entry.get("team2", "")
+        teams = (team1.replace(" 🎾", ""), team2.replace(" 🎾", ""))
+        point_teams = point_ms = error = None
+        try:
+            events = entry["point_history"]
+            point_teams = array("B", (teams.index(event["scoring_team"]) for event in events))
+            point_ms = array("I", (parse_match_time(event["time"]) * 1000 for event in events))
+        except (KeyError, TypeError, ValueError) as e:
+            error = f"unreadable point history: {e!r}"
+        yield _record(number, entry.get("date", ""), teams[0], teams[1], None, None,
+                      entry.get("score", ""), _winner_from_names(team1, team2),
+                      point_teams, point_ms, error)
+
+def _formats(record, default_format):
+    # Formats to try, most likely first: the recorded one, else the default
+    # given on the command line, else guesses from the recorded score, else
+    # the usual club formats.
+    if record["games_per_set"] and record["total_sets"]:
+        return [(int(record["games_per_set"]), int(record["total_sets"]))]
+    if default_format is not None:
+        return [default_format]
+    try:
+        return history_store.candidate_formats(None, None, record["score"])
+    except (ValueError, AttributeError):
+        return list(FALLBACK_FORMATS)
+
+def _replay(record, games_per_set, total_sets):
+    # (match, None, None) when the points finish the match, else (match,
+    # UNFINISHED or INVALID, message).
+    match = Match(record["team1_name"], record["team2_name"], games_per_set, total_sets)
+    for team_index, ms in zip(record["point_teams"], record["point_ms"]):
+        if match.match_over:
+            return match, INVALID, "points after the end of the match"
+        if team_index > 1:
+            return match, INVALID, f"invalid team {team_index + 1}"
+        match._record_point(team_index, ms)
+    if not match.match_over:
+        return match, UNFINISHED, "the points do not finish the match"
+    return match, None, None
+
+def rescore(record, default_format=None):
+    # Output row (OUTPUT_COLUMNS) for one record.
+    result = {
+        "source_id": record["source_id"],
+        "date": record["date"],
+        "team1_name": record["team1_name"],
+        "team2_name": record["team2_name"],
+        "games_per_set": record["games_per_set"] or "",
+        "total_sets": record["total_sets"] or "",
+        "recorded_score": record["score"],
+        "score": "",
+        "winner": "",
+        "duration": "",
+        "points_played": 0 if record["point_teams"] is None else len(record["point_teams"]),
+        "status": INVALID,
+        "message": record["error"] or "",
+    }
+    if record["error"]:
+        return result
+    # Take the first format that reproduces the recorded score, else the
+    # likeliest one in which the points finish the match.
+    replays = [_replay(record, *match_format) for match_format in _formats(record, default_format)]
+    finished = [replay for replay in replays if replay[1] is None]
+    matching = [replay for replay in finished if history_entry(replay[0])["score"] == record["score"]]
+    match, status, message = (matching or finished or replays)[0]
+    result["games_per_set"], result["total_sets"] = match.games_per_set, match.total_sets
+    if status is not None:
+        result["status"], result["message"] = status, message
+        return result
+    result["score"] = history_entry(match)["score"]
+    result["winner"] = match._winner + 1
+    result["duration"] = match.get_match_time()
+    messages = []
+    if result["score"] != record["score"]:
+        messages.append(f"recorded score {record['score']!r}" if record["score"] else "no recorded score")
+    if record["winner"] is not None and record["winner"] != result["winner"]:
+        messages.append(f"recorded winner {record['winner']}")
+    result["status"] = CORRECTED if messages else OK
+    result["message"] = "; ".join(messages)
+    return result
+
+def rescore_batch(records, default_format=None):
+    return [rescore(record, default_format) for record in records]
+
+def _batches(records, batch_size):
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def rescore_all(records, workers=1, batch_size=BATCH_SIZE, default_format=None):
+    # Rescored rows of `records`, in order. At most two batches per worker
+    # are queued, so input and output are streamed.
+    if workers <= 1:
+        for batch in _batches(records, batch_size):
+            yield from rescore_batch(batch, default_format)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for batch in _batches(records, batch_size):
+            pending.append(executor.submit(rescore_batch, batch, default_format))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def run(records, output, workers=1, batch_size=BATCH_SIZE, default_format=None, progress=None):
+    # Write the rescored rows to the CSV file `output`. Returns ({status:
+    # count}, matches per second).
+    counts = dict.fromkeys((OK, CORRECTED, UNFINISHED, INVALID), 0)
+    start = time.perf_counter()
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, OUTPUT_COLUMNS)
+        writer.writeheader()
+        for number, result in enumerate(rescore_all(records, workers, batch_size, default_format), 1):
+            writer.writerow(result)
+            counts[result["status"]] += 1
+            if progress and number % PROGRESS_EVERY == 0:
+                progress(number, number / (time.perf_counter() - start))
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - start
+    return counts, total / elapsed if elapsed else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay point logs through the scoring rules and write corrected match summaries.")
+    parser.add_argument("source", choices=("history", "archive", "legacy"),
+                        help="the stored history, an archive directory or a match_history.pkl")
+    parser.add_argument("path", nargs="?", help="archive directory or pickle file")
+    parser.add_argument("--output", default="rescored.csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--games-per-set", type=int, help="format of matches that do not record one")
+    parser.add_argument("--total-sets", type=int, help="format of matches that do not record one")
+    args = parser.parse_args()
+
+    if args.source != "history" and not args.path:
+        parser.error(f"{args.source} needs a path")
+    if (args.games_per_set is None) != (args.total_sets is None):
+        parser.error("give both --games-per-set and --total-sets")
+    default_format = (args.games_per_set, args.total_sets) if args.games_per_set else None
+    if args.source == "history":
+        records = history_records()
+    elif args.source == "archive":
+        records = archive_records(args.path)
+    else:
+        records = legacy_records(args.path)
+
+    def progress(number, rate):
+        print(f"{number} matches ({rate:.0f}/s)", file=sys.stderr)
+
+    counts, rate = run(records, args.output, args.workers, args.batch_size, default_format, progress)
+    print(f"Rescored {sum(counts.values())} matches at {rate:.0f} matches/s: "
+          f"{counts[OK]} ok, {counts[CORRECTED]} corrected, {counts[UNFINISHED]} unfinished, "
+          f"{counts[INVALID]} invalid. Summaries written to {args.output}")
+
+if __name__ == "__main__":
+    main()
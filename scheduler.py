@@ -0,0 +1,272 @@
+import argparse
+import csv
+import datetime
+import heapq
+import time
+from functools import lru_cache
+
+import numpy as np
+
+import court_registry
+import point_timing
+import state_manager
+import win_probability
+from scoring_table import get_table
+from simulator import DEFAULT_POINT_SECONDS
+
+# Court scheduler for tournament draws. Each pending match's duration is
+# estimated from the history of its format (point_timing.history_timing),
+# and matches are assigned to courts longest first, each to the court that
+# frees up first (LPT list scheduling; without shared teams the makespan is
+# within 4/3 of the optimum). A team never plays two matches at once.
+# Courts with a live match are free once its expected remaining time has
+# passed: the expected number of points left from its current score, solved
+# per format like the win probability, times its pace so far. Estimates of
+# the draw are kept, so re-planning after a score change is a table lookup
+# and a scheduling pass over the draw.
+#
+#   python scheduler.py draw.csv --courts 8
+#   python scheduler.py draw.csv --live --changeover 5
+#
+# The draw is a CSV file with the columns match_id, team1, team2,
+# games_per_set and total_sets.
+
+DRAW_COLUMNS = ("match_id", "team1", "team2", "games_per_set", "total_sets")
+
+# Recorded matches of a format needed before their mean duration is used
+# instead of the expected number of points times the mean time per point.
+MIN_FORMAT_MATCHES = 5
+
+# Pseudo-points of the history pace mixed into a live match's own pace.
+PRIOR_POINTS = 20
+
+# Minutes between the end of a match and the start of the next on a court.
+CHANGEOVER_MINUTES = 5
+
+def _solve_expected_points(table):
+    # Expected number of points left from every state, for every point
+    # probability p on the win_probability grid: E = 1 + p * E[team 1
+    # scores] + (1 - p) * E[team 2 scores], 0 once the match is over. As in
+    # win_probability._solve, deuces are solved in closed form: deuce = (2 +
+    # p^2 * W1 + q^2 * W2) / (1 - 2pq), with W1/W2 the values after either
+    # team converts its advantage.
+    p = np.linspace(0.0, 1.0, win_probability.POINT_PROBABILITY_STEPS + 1)
+    q = 1.0 - p
+    next_state = table.next_state
+    running = table.winners == -1
+    deuces, advantages = win_probability._deuces(table)
+
+    values = np.zeros((len(table.states), len(p)))
+    for state in win_probability._post_order(table, deuces, advantages):
+        if not running[state] or state in advantages:
+            continue
+        next1, next2 = next_state[state]
+        if state in deuces:
+            win1 = values[next_state[next1, 0]]
+            win2 = values[next_state[next2, 1]]
+            values[state] = (2.0 + p * p * win1 + q * q * win2) / (1.0 - 2.0 * p * q)
+            values[next1] = 1.0 + p * win1 + q * values[state]
+            values[next2] = 1.0 + p * values[state] + q * win2
+        else:
+            values[state] = 1.0 + p * values[next1] + q * values[next2]
+    return values.T.copy()
+
+@lru_cache(maxsize=None)
+def get_expected_points_table(games_per_set=6, total_sets=3):
+    return _solve_expected_points(get_table(games_per_set, total_sets))
+
+def expected_points(match, point_probability=None):
+    # Expected number of points left in `match` from its current score, by
+    # default at the share of points team 1 has won so far.
+    if point_probability is None:
+        point_probability = win_probability.estimate_point_probability(match)
+    values = get_expected_points_table(match.games_per_set, match.total_sets)
+    state = get_table(match.games_per_set, match.total_sets).state_id(match)
+    step = int(round(point_probability * win_probability.POINT_PROBABILITY_STEPS))
+    return float(values[step, state])
+
+def _point_ms(timing, match_format):
+    # Mean time per point of a format, else over all formats, else the
+    # simulator's default.
+    if match_format in timing:
+        return timing[match_format]["mean_gap_ms"]
+    points = sum(format_timing["points"] for format_timing in timing.values())
+    if points:
+        return sum(format_timing["mean_match_ms"] * format_timing["matches"]
+                   for format_timing in timing.values()) / points
+    return DEFAULT_POINT_SECONDS * 1000
+
+def estimate_match_ms(games_per_set, total_sets, timing):
+    # Expected duration of a match that has not started, from `timing`
+    # (point_timing.history_timing()).
+    match_format = (games_per_set, total_sets)
+    if match_format in timing and timing[match_format]["matches"] >= MIN_FORMAT_MATCHES:
+        return timing[match_format]["mean_match_ms"]
+    table = get_table(games_per_set, total_sets)
+    step = win_probability.POINT_PROBABILITY_STEPS // 2
+    points = get_expected_points_table(games_per_set, total_sets)[step, table.initial_state]
+    return float(points) * _point_ms(timing, match_format)
+
+def remaining_match_ms(match, timing):
+    # Expected time left in a live Match: the points left from its score
+    # times its own pace, pulled towards the history pace early on.
+    if match is None or match.match_over:
+        return 0.0
+    history_ms = _point_ms(timing, (match.games_per_set, match.total_sets))
+    played_ms = match.point_ms[-1] if match.point_ms else 0
+    point_ms = (played_ms + PRIOR_POINTS * history_ms) / (len(match.point_ms) + PRIOR_POINTS)
+    return expected_points(match) * point_ms
+
+class CourtPlanner:
+
+    def __init__(self, court_ids, timing=None, changeover_ms=CHANGEOVER_MINUTES * 60000):
+        # Times are in ms from now: update every court's match and re-plan
+        # to move the plan on.
+        self.timing = point_timing.history_timing() if timing is None else timing
+        self.changeover_ms = changeover_ms
+        self._free_ms = dict.fromkeys(court_ids, 0.0)
+        # Teams on court, who are busy until their court is free.
+        self._court_teams = {}
+        self._pending = {}
+        # Pending match ids, longest first; None once the draw changes.
+        self._order = None
+
+    def add_matches(self, draw):
+        # Add draw rows (DRAW_COLUMNS) to the pending matches.
+        estimates = {}
+        for row in draw:
+            match_format = (int(row["games_per_set"]), int(row["total_sets"]))
+            if match_format not in estimates:
+                estimates[match_format] = estimate_match_ms(*match_format, self.timing)
+                # Solved now, so live matches of the draw re-plan at once.
+                get_expected_points_table(*match_format)
+            self._pending[row["match_id"]] = {
+                "match_id": row["match_id"],
+                "team1": row["team1"],
+                "team2": row["team2"],
+                "games_per_set": match_format[0],
+                "total_sets": match_format[1],
+                "estimate_ms": estimates[match_format],
+            }
+        self._order = None
+
+    def start_match(self, match_id, court_id, match=None):
+        # A pending match has been called onto a court.
+        del self._pending[match_id]
+        self._order = None
+        self.update_court(court_id, match)
+
+    def update_court(self, court_id, match):
+        # The court's current Match (None if it has none) changed.
+        if match is None or match.match_over:
+            self._free_ms[court_id] = 0.0
+            self._court_teams.pop(court_id, None)
+        else:
+            self._free_ms[court_id] = remaining_match_ms(match, self.timing) + self.changeover_ms
+            self._court_teams[court_id] = (match.team1_name, match.team2_name)
+
+    @property
+    def court_ids(self):
+        return list(self._free_ms)
+
+    def remove_court(self, court_id):
+        del self._free_ms[court_id]
+        self._court_teams.pop(court_id, None)
+
+    def plan(self):
+        # Assignments of every pending match, in start order: dicts of the
+        # draw fields plus court_id, start_ms and end_ms. A match does not
+        # start before both of its teams are off court, so each court that
+        # frees up takes the longest match whose teams are free by then,
+        # else the one that can start first.
+        if self._order is None:
+            self._order = sorted(self._pending, key=lambda match_id: -self._pending[match_id]["estimate_ms"])
+        if not self._free_ms:
+            return []
+        courts = [(free_ms, court_id) for court_id, free_ms in self._free_ms.items()]
+        heapq.heapify(courts)
+        team_free_ms = {}
+        for court_id, teams in self._court_teams.items():
+            for team in teams:
+                team_free_ms[team] = self._free_ms[court_id] - self.changeover_ms
+        remaining = [self._pending[match_id] for match_id in self._order]
+        assignments = []
+        while remaining:
+            free_ms, court_id = heapq.heappop(courts)
+            chosen = None
+            for index, pending in enumerate(remaining):
+                ready_ms = max(team_free_ms.get(pending["team1"], 0.0), team_free_ms.get(pending["team2"], 0.0))
+                if ready_ms <= free_ms:
+                    chosen, start_ms = index, free_ms
+                    break
+                if chosen is None or ready_ms < start_ms:
+                    chosen, start_ms = index, ready_ms
+            pending = remaining.pop(chosen)
+            end_ms = start_ms + pending["estimate_ms"]
+            team_free_ms[pending["team1"]] = team_free_ms[pending["team2"]] = end_ms
+            heapq.heappush(courts, (end_ms + self.changeover_ms, court_id))
+            assignments.append(dict(pending, court_id=court_id, start_ms=start_ms, end_ms=end_ms))
+        assignments.sort(key=lambda assignment: (assignment["start_ms"], assignment["court_id"]))
+        return assignments
+
+    def makespan_ms(self, assignments):
+        # When the last court is done, plan or live matches alike.
+        live_ms = [free_ms - self.changeover_ms for free_ms in self._free_ms.values() if free_ms]
+        return max([assignment["end_ms"] for assignment in assignments] + live_ms, default=0.0)
+
+def load_draw(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = set(DRAW_COLUMNS) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} is missing the columns {', '.join(sorted(missing))}")
+        return list(reader)
+
+def live_planner(timing=None, changeover_ms=CHANGEOVER_MINUTES * 60000):
+    # CourtPlanner over the registered courts and their current matches.
+    court_ids = court_registry.list_courts()
+    planner = CourtPlanner(court_ids, timing, changeover_ms)
+    for court_id in court_ids:
+        planner.update_court(court_id, state_manager.load_state(court_id))
+    return planner
+
+def _clock(now, ms):
+    return (now + datetime.timedelta(milliseconds=ms)).strftime("%H:%M")
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign a draw of pending matches to courts, with durations estimated from the match history.")
+    parser.add_argument("draw", help="CSV file with the columns " + ", ".join(DRAW_COLUMNS))
+    parser.add_argument("--courts", type=int, default=4, help="number of free courts to plan for")
+    parser.add_argument("--live", action="store_true",
+                        help="plan for the registered courts, after their current matches")
+    parser.add_argument("--changeover", type=float, default=CHANGEOVER_MINUTES,
+                        help="minutes between matches on a court")
+    args = parser.parse_args()
+
+    try:
+        draw = load_draw(args.draw)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    timing = point_timing.history_timing()
+    changeover_ms = args.changeover * 60000
+    if args.live:
+        planner = live_planner(timing, changeover_ms)
+    else:
+        planner = CourtPlanner([str(number) for number in range(1, args.courts + 1)], timing, changeover_ms)
+    planner.add_matches(draw)
+    start = time.perf_counter()
+    assignments = planner.plan()
+    elapsed = time.perf_counter() - start
+
+    now = datetime.datetime.now()
+    print(f"{'court':>8} {'start':>6} {'end':>6}  match")
+    for assignment in assignments:
+        print(f"{assignment['court_id']:>8} {_clock(now, assignment['start_ms']):>6}"
+              f" {_clock(now, assignment['end_ms']):>6}  {assignment['match_id']}:"
+              f" {assignment['team1']} vs {assignment['team2']}"
+              f" ({assignment['games_per_set']}g/{assignment['total_sets']}s)")
+    print(f"Planned {len(assignments)} matches on {len(planner.court_ids)} courts in {elapsed * 1e3:.2f} ms;"
+          f" last match ends at {_clock(now, planner.makespan_ms(assignments))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+import argparse
+import asyncio
+import json
+import logging
+import pickle
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import court_registry
+import metrics
+import point_timing
+import scoreboard
+import state_manager
+import win_probability
+from match import Match
+
+# Local scoring service. Points posted here are applied to an in-memory Match
+# and pushed to every subscribed board straight away; the journal, snapshots
+# and history are written afterwards, in order, by a background task per
+# court. While it runs, score a court only through the service. A court
+# whose files could not be written takes no more changes (503) until the
+# service restarts and reloads it from disk.
+#
+#   GET  /courts/<court>/score          current score (JSON)
+#   GET  /courts/<court>/events         score updates as server-sent events
+#   GET  /courts/<court>/board          minimal live scoreboard page
+#   POST /courts/<court>/point?team=1   point for team 1 or 2 (or {"team": 1})
+#   POST /courts/<court>/undo           undo the last point
+#   POST /courts/<court>/redo           redo the last undone point
+#   POST /courts/<court>/pause          stop the match clock for a break
+#   POST /courts/<court>/resume         restart the match clock
+#   POST /courts/<court>/match          new match: {"team1", "team2",
+#                                       "games_per_set", "total_sets"}
+#   GET  /metrics                       timings in Prometheus text format
+#                                       (with SCOREBOARD_METRICS=1)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Updates queued per subscriber; a board that falls behind skips to the
+# latest score.
+SUBSCRIBER_QUEUE_SIZE = 8
+
+BOARD_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Beach Tennis Score Board</title>{css}</head>
+<body style="background: #111;"><div id="board">{html}</div>
+<script>
+new EventSource("events").onmessage = function (event) {{
+    document.getElementById("board").innerHTML = JSON.parse(event.data).html;
+}};
+</script></body></html>
+"""
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class CourtSession:
+    # The live Match of one court, its subscribers and its write queue.
+
+    def __init__(self, court_id, lang):
+        self.court_id = court_id
+        self.lang = lang
+        self.match = state_manager.load_state(court_id)
+        # Point timings, updated as points are scored.
+        self.timer = None if self.match is None else point_timing.match_timer(self.match)
+        self.subscribers = set()
+        self.writes = asyncio.Queue()
+        # The first write that failed. Later writes would leave the files
+        # out of step with the match, so the court takes no more changes.
+        self.write_error = None
+        self.writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    def snapshot(self):
+        match = self.match
+        html = scoreboard.render_scoreboard(scoreboard.build_scoreboard_html(match, self.lang),
+                                            scoreboard.match_clock(match))
+        if match is None:
+            return {"court": self.court_id, "match": None, "html": html}
+        return {
+            "court": self.court_id,
+            "match": {
+                "team1": match.team1_name,
+                "team2": match.team2_name,
+                "sets": list(match._sets),
+                "games": list(match._games),
+                "points": [str(points) for points in match.game_points()],
+                "game_mode": match.game_mode,
+                "match_over": match.match_over,
+                "winner": match.winner,
+                "points_played": len(match.point_teams),
+                "start_time": match.start_time.isoformat(),
+                "elapsed_ms": match.elapsed_ms(),
+                "paused": match.paused,
+            },
+            "timing": self.timer.summary(),
+            "html": html,
+        }
+
+    def add_point(self, team_index):
+        self._check_writable()
+        match = self._running_match()
+        sets_before = len(match.set_history)
+        was_paused = match.paused
+        match.add_point_index(team_index)
+        self.timer.add(team_index, match.point_ms[-1])
+        # Like state_manager.save_point_index, snapshot when the point ended a pause.
+        snapshot = match.match_over or was_paused or len(match.set_history) != sets_before
+        self._changed(team_index, match.point_ms[-1] / 1000, snapshot)
+
+    def undo(self):
+        self._check_writable()
+        was_over = self.match is not None and self.match.match_over
+        if was_over and self.match.added_to_history:
+            # Like Score Track, which offers no undo once a match is over:
+            # the history already holds the result.
+            raise HTTPError(HTTPStatus.CONFLICT, "the match is over and recorded")
+        if self.match is None or not self.match.undo():
+            raise HTTPError(HTTPStatus.CONFLICT, "nothing to undo")
+        self.timer = point_timing.match_timer(self.match)
+        self._changed(state_manager.JOURNAL_UNDO, 0.0, was_over)
+
+    def redo(self):
+        self._check_writable()
+        if self.match is None or not self.match.redo():
+            raise HTTPError(HTTPStatus.CONFLICT, "nothing to redo")
+        self.timer.add(self.match.point_teams[-1], self.match.point_ms[-1])
+        self._changed(state_manager.JOURNAL_REDO, 0.0, False)
+
+    def pause(self):
+        self._check_writable()
+        if not self._running_match().pause():
+            raise HTTPError(HTTPStatus.CONFLICT, "the clock is already paused")
+        self._saved_snapshot()
+
+    def resume(self):
+        self._check_writable()
+        if not self._running_match().resume():
+            raise HTTPError(HTTPStatus.CONFLICT, "the clock is already running")
+        self._saved_snapshot()
+
+    def new_match(self, team1_name, team2_name, games_per_set, total_sets):
+        self._check_writable()
+        if self.match is not None and not self.match.match_over:
+            raise HTTPError(HTTPStatus.CONFLICT, "a match is in progress")
+        self.match = Match(team1_name, team2_name, games_per_set, total_sets)
+        self.timer = point_timing.match_timer(self.match)
+        self.writes.put_nowait((_save_new_match, self.court_id, _copy(self.match)))
+        self._publish()
+
+    def _check_writable(self):
+        if self.write_error is not None:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE,
+                            f"the score of this court could not be saved: {self.write_error!r}")
+
+    def _running_match(self):
+        if self.match is None or self.match.match_over:
+            raise HTTPError(HTTPStatus.CONFLICT, "no match in progress")
+        return self.match
+
+    def _saved_snapshot(self):
+        self.writes.put_nowait((state_manager.save_state, _copy(self.match), self.court_id))
+        self._publish()
+
+    def _changed(self, marker, seconds, snapshot):
+        # Queue the write, then notify the boards. A journal record only needs
+        # (marker, seconds); a snapshot gets a copy of the match, so the writer
+        # thread never sees later points.
+        match_copy = _copy(self.match) if snapshot else None
+        if self.match.match_over:
+            self.match.added_to_history = True
+        self.writes.put_nowait((_save_change, self.court_id, match_copy, marker, seconds, snapshot))
+        self._publish()
+
+    def _publish(self):
+        update = self.snapshot()
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            write, *args = await self.writes.get()
+            try:
+                if self.write_error is None:
+                    await loop.run_in_executor(None, write, *args)
+            except Exception as e:
+                logger.exception("Court %s: could not save the score; taking no more changes",
+                                 self.court_id)
+                self.write_error = e
+            finally:
+                self.writes.task_done()
+
+def _copy(match):
+    return pickle.loads(pickle.dumps(match))
+
+def _save_change(court_id, match, marker, seconds, snapshot):
+    # `match` is None for a change that is only journaled.
+    state_manager.journal_change(match, marker, seconds, snapshot, court_id)
+    if match is not None:
+        state_manager.record_finished_match(match, court_id)
+
+def _save_new_match(court_id, match):
+    state_manager.save_state(match, court_id)
+    win_probability.get_probability_table(match.games_per_set, match.total_sets)
+
+class ScoreService:
+
+    def __init__(self, lang="pt"):
+        self.lang = lang
+        self.courts = {}
+
+    def court(self, court_id):
+        try:
+            court_id = court_registry.validate_court_id(court_id)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.NOT_FOUND, str(e))
+        session = self.courts.get(court_id)
+        if session is None:
+            court_registry.register_court(court_id)
+            session = self.courts[court_id] = CourtSession(court_id, self.lang)
+        return session
+
+    async def flush(self):
+        # Wait until every queued write has reached the disk.
+        for session in self.courts.values():
+            await session.writes.join()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    _write_response(writer, e.status, "application/json",
+                                    json.dumps({"error": str(e)}).encode("utf-8"), False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                if method == "GET" and path.endswith("/events"):
+                    await self._stream_events(path, writer)
+                    break
+                try:
+                    status, content_type, content = self._dispatch(method, path, query, body)
+                except HTTPError as e:
+                    status, content_type, content = e.status, "application/json", {"error": str(e)}
+                if content_type == "application/json":
+                    content = json.dumps(content)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, content_type, content.encode("utf-8"), keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, method, path, query, body):
+        if method == "GET" and path == "/metrics":
+            return HTTPStatus.OK, "text/plain", metrics.render_prometheus()
+        parts = path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "courts":
+            raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+        action = (method, parts[2])
+        if action == ("GET", "board"):
+            html = self.court(parts[1]).snapshot()["html"]
+            return HTTPStatus.OK, "text/html", BOARD_PAGE.format(css=scoreboard.SCOREBOARD_CSS, html=html)
+        if action not in (("GET", "score"), ("POST", "point"), ("POST", "undo"),
+                          ("POST", "redo"), ("POST", "pause"), ("POST", "resume"),
+                          ("POST", "match")):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+        session = self.court(parts[1])
+        fields = _parse_body(body)
+        if action == ("POST", "point"):
+            team = fields.get("team", query.get("team", [None])[0])
+            if str(team) not in ("1", "2"):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "team must be 1 or 2")
+            session.add_point(int(team) - 1)
+        elif action == ("POST", "undo"):
+            session.undo()
+        elif action == ("POST", "redo"):
+            session.redo()
+        elif action == ("POST", "pause"):
+            session.pause()
+        elif action == ("POST", "resume"):
+            session.resume()
+        elif action == ("POST", "match"):
+            try:
+                games_per_set = int(fields.get("games_per_set", 6))
+                total_sets = int(fields.get("total_sets", 1))
+            except (TypeError, ValueError):
+                games_per_set = total_sets = 0
+            # A match with no sets or games to win never ends, and its scoring
+            # table would never finish building.
+            if games_per_set < 1 or total_sets < 1:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "games_per_set and total_sets must be positive integers")
+            session.new_match(str(fields.get("team1", "Team A")), str(fields.get("team2", "Team B")),
+                              games_per_set, total_sets)
+        return HTTPStatus.OK, "application/json", session.snapshot()
+
+    async def _stream_events(self, path, writer):
+        parts = path.strip("/").split("/")
+        try:
+            if len(parts) != 3 or parts[0] != "courts":
+                raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+            session = self.court(parts[1])
+        except HTTPError as e:
+            _write_response(writer, e.status, "application/json",
+                            json.dumps({"error": str(e)}).encode("utf-8"), False)
+            return
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        queue.put_nowait(session.snapshot())
+        session.subscribers.add(queue)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                         b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+            while True:
+                update = await queue.get()
+                writer.write(f"data: {json.dumps(update)}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            session.subscribers.discard(queue)
+
+async def _read_request(reader):
+    # (method, path, query, headers, body), None once the client is done, or
+    # HTTPError for a request that cannot be parsed.
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        content_length = int(headers.get("content-length", 0))
+    except ValueError:
+        content_length = -1
+    if content_length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed Content-Length")
+    body = await reader.readexactly(content_length)
+    url = urlsplit(target)
+    return method.upper(), url.path, parse_qs(url.query), headers, body
+
+def _parse_body(body):
+    if not body:
+        return {}
+    try:
+        fields = json.loads(body)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+    if not isinstance(fields, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+    return fields
+
+def _write_response(writer, status, content_type, content, keep_alive):
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}; charset=utf-8\r\n"
+        f"Content-Length: {len(content)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + content
+    )
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, lang="pt"):
+    service = ScoreService(lang)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local scoring service with live score updates.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--lang", choices=("pt", "en"), default="pt")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    print(f"Scoring service on http://{args.host}:{args.port}/courts/<court>/")
+    asyncio.run(serve(args.host, args.port, args.lang))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import datetime
+from translations import get_translation
+import win_probability
+import metrics
+
+# Marker replaced by the live match clock when a cached scoreboard is shown.
+MATCH_TIME_SLOT = "<!--match-time-->"
+
+SCOREBOARD_CSS = """
+<style>
+.scoreboard {
+    background-color: #000;
+    color: #fff;
+    padding: 20px;
+    border-radius: 10px;
+    text-align: center;
+    font-family: 'Arial', sans-serif;
+    margin-bottom: 30px;
+}
+.header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 20px;
+}
+.header > .team-name {
+    flex: 0 0 40%;
+    font-size: 2.5rem;
+    font-weight: bold;
+    text-align: center;
+}
+.header > .match-time {
+    flex: 0 0 20%;
+    font-size: 1.5rem;
+    text-align: center;
+}
+.scores {
+    display: flex;
+    justify-content: space-around;
+    margin-top: 20px;
+}
+.score-block {
+    background: #333;
+    padding: 15px;
+    border-radius: 10px;
+    width: 30%;
+}
+.score-block .label {
+    font-size: 1rem;
+    color: #bbb;
+}
+.score-block .value {
+    font-size: 2rem;
+    margin-bottom: 10px;
+}
+.match-status {
+    margin-top: 20px;
+    font-size: 1.5rem;
+    font-weight: bold;
+}
+.win-probability {
+    margin-top: 10px;
+    font-size: 1rem;
+    color: #bbb;
+}
+</style>
+"""
+
+HISTORY_CSS = """
+<style>
+.match-history-table {
+     width: 100%;
+     border-collapse: collapse;
+     margin: 20px 0;
+     font-family: Arial, sans-serif;
+     font-size: 16px;
+     color: #333;
+}
+.match-history-table th, .match-history-table td {
+     border: 1px solid #ddd;
+     padding: 8px;
+     text-align: center;
+}
+.match-history-table th {
+     background-color: #000;
+     color: #fff;
+}
+.match-history-table tr:nth-child(even) {
+     background-color: #f2f2f2;
+}
+.match-history-table tr:hover {
+     background-color: #ddd;
+}
+</style>
+"""
+
+def _highlight(value, highlighted):
+    # Green (#0f0) if this team won the last closed game/set/point.
+    return f'<span style="color: {"#0f0" if highlighted else "#fff"};">{value}</span>'
+
+@metrics.timed("scoreboard.build_html")
+def build_scoreboard_html(match_state, lang):
+    # The match clock is left as MATCH_TIME_SLOT so the result can be cached
+    # for as long as the match state does not change.
+    if match_state is not None:
+        sets = match_state._sets
+        games = match_state._games
+        points = match_state.game_points()
+        team1_name = match_state.team1_name
+        team2_name = match_state.team2_name
+        match_status = get_translation(lang, "match_over") + match_state.winner if match_state.match_over else get_translation(lang, "match_in_progress_status")
+        win_probability_html = "" if match_state.match_over else build_win_probability_html(match_state, lang)
+
+        # Team indices of the last point scorer and of the last closed game
+        # and set winners; indices stay right when both names are the same.
+        last_point_team = match_state.point_teams[-1] if match_state.point_teams else None
+        last_game_winner = match_state._last_game_winner
+        last_set_winner = match_state._last_set_winner
+
+        team1_sets_html = _highlight(sets[0], last_set_winner == 0)
+        team2_sets_html = _highlight(sets[1], last_set_winner == 1)
+        team1_games_html = _highlight(games[0], last_game_winner == 0)
+        team2_games_html = _highlight(games[1], last_game_winner == 1)
+        team1_points_html = _highlight(points[0], last_point_team == 0)
+        team2_points_html = _highlight(points[1], last_point_team == 1)
+    else:
+        team1_sets_html = team1_games_html = team1_points_html = "-"
+        team2_sets_html = team2_games_html = team2_points_html = "-"
+        match_status = get_translation(lang, "waiting_for_next_match")
+        win_probability_html = ""
+        team1_name = "-"
+        team2_name = "-"
+
+    return f"""
+    <div class="scoreboard">
+      <div class="header">
+        <div class="team-name">{team1_name}</div>
+        <div class="match-time">{MATCH_TIME_SLOT}</div>
+        <div class="team-name">{team2_name}</div>
+      </div>
+      <div class="scores">
+        <div class="score-block">
+          <div class="label">Sets</div>
+          <div class="value">{team1_sets_html}</div>
+          <div class="label">Games</div>
+          <div class="value">{team1_games_html}</div>
+          <div class="label">Points</div>
+          <div class="value">{team1_points_html}</div>
+        </div>
+        <div class="score-block">
+          <div class="label">Sets</div>
+          <div class="value">{team2_sets_html}</div>
+          <div class="label">Games</div>
+          <div class="value">{team2_games_html}</div>
+          <div class="label">Points</div>
+          <div class="value">{team2_points_html}</div>
+        </div>
+      </div>
+      <div class="match-status">{match_status}</div>
+      {win_probability_html}
+    </div>
+    """
+
+def build_win_probability_html(match_state, lang):
+    point_probability = win_probability.estimate_point_probability(match_state)
+    team1_chance = win_probability.win_probability(match_state, point_probability)
+    return (
+        f'<div class="win-probability">{get_translation(lang, "win_probability")}'
+        f'{match_state.team1_name} {team1_chance:.0%} · {match_state.team2_name} {1 - team1_chance:.0%}</div>'
+    )
+
+def render_scoreboard(scoreboard_html, match_time):
+    return scoreboard_html.replace(MATCH_TIME_SLOT, match_time)
+
+def match_clock(match_state):
+    if match_state is None or match_state.match_over:
+        return "-"
+    if match_state.paused:
+        return f"{match_state.get_match_time()} ⏸"
+    return match_state.get_match_time()
+
+def build_history_table(entries):
+    html_table = "<table class='match-history-table'>"
+    html_table += "<thead><tr><th>Team 1</th><th>Team 2</th><th>Score</th><th>Duration</th></tr></thead><tbody>"
+    for entry in entries:
+         html_table += (
+             f"<tr>"
+             f"<td>{entry['team1']}</td>"
+             f"<td>{entry['team2']}</td>"
+             f"<td>{entry['score']}</td>"
+             f"<td>{entry['duration']}</td>"
+             f"</tr>"
+         )
+    html_table += "</tbody></table>"
+    return HISTORY_CSS + html_table
+
+def build_courts_table(courts, lang):
+    # All-courts overview from court_registry.overview_row() rows.
+    html_table = "<table class='match-history-table'>"
+    html_table += (
+        f"<thead><tr><th>{get_translation(lang, 'court')}</th><th>Team 1</th><th>Team 2</th>"
+        f"<th>Sets</th><th>Games</th><th>Points</th><th>Status</th></tr></thead><tbody>"
+    )
+    for court in courts:
+        if court["match_over"]:
+            status = get_translation(lang, "match_over") + court["winner"]
+        else:
+            # The match clock, as on the court's own board.
+            status = str(datetime.timedelta(milliseconds=court["elapsed_ms"])).split(".")[0]
+            if court["paused"]:
+                status += " ⏸"
+        html_table += (
+            f"<tr>"
+            f"<td>{court['court_id']}</td>"
+            f"<td>{court['team1']}</td>"
+            f"<td>{court['team2']}</td>"
+            f"<td>{court['sets1']}-{court['sets2']}</td>"
+            f"<td>{court['games1']}-{court['games2']}</td>"
+            f"<td>{court['points1']}-{court['points2']}</td>"
+            f"<td>{status}</td>"
+            f"</tr>"
+        )
+    html_table += "</tbody></table>"
+    if not courts:
+        html_table = f"<p>{get_translation(lang, 'no_active_courts')}</p>"
+    return HISTORY_CSS + html_table
+
+def _format_seconds(seconds):
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+def build_leaderboard_table(teams, lang):
+    # Standings from team_stats.leaderboard() rows.
+    if not teams:
+        return f"<p>{get_translation(lang, 'no_team_stats')}</p>"
+    headers = ("team", "matches_played", "wins", "losses", "set_difference", "game_difference",
+               "tiebreaks", "average_duration", "serve_points_won", "longest_serve_streak")
+    html_table = "<table class='match-history-table'><thead><tr>"
+    html_table += "".join(f"<th>{get_translation(lang, header)}</th>" for header in headers)
+    html_table += "</tr></thead><tbody>"
+    for team in teams:
+        serve_share = team["serve_points_won"] / team["serve_points"] if team["serve_points"] else 0.0
+        html_table += (
+            f"<tr>"
+            f"<td>{team['team_name']}</td>"
+            f"<td>{team['matches']}</td>"
+            f"<td>{team['wins']}</td>"
+            f"<td>{team['losses']}</td>"
+            f"<td>{team['sets_won'] - team['sets_lost']:+d}</td>"
+            f"<td>{team['games_won'] - team['games_lost']:+d}</td>"
+            f"<td>{team['tiebreaks_won']}-{team['tiebreaks_lost']}</td>"
+            f"<td>{_format_seconds(team['duration_seconds'] / team['matches'])}</td>"
+            f"<td>{serve_share:.0%}</td>"
+            f"<td>{team['longest_serve_streak']}</td>"
+            f"</tr>"
+        )
+    html_table += "</tbody></table>"
+    return HISTORY_CSS + html_table
+
+def build_metrics_table(spans):
+    # Timings from metrics.summary(), in milliseconds.
+    html_table = "<table class='match-history-table'><thead><tr>"
+    html_table += "<th>Span</th><th>Count</th><th>Mean (ms)</th><th>Max (ms)</th><th>Total (s)</th>"
+    html_table += "</tr></thead><tbody>"
+    for name, span in spans.items():
+        html_table += (
+            f"<tr>"
+            f"<td>{name}</td>"
+            f"<td>{span['count']}</td>"
+            f"<td>{span['mean'] * 1e3:.2f}</td>"
+            f"<td>{span['max'] * 1e3:.2f}</td>"
+            f"<td>{span['total']:.2f}</td>"
+            f"</tr>"
+        )
+    html_table += "</tbody></table>"
+    return HISTORY_CSS + html_table
@@ -0,0 +1,147 @@
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+from match import Match
+
+GAME_MODES = ("regular", "tiebreak", "super_tiebreak")
+
+# Points needed to win a tiebreak / super tiebreak (win by 2).
+TIEBREAK_TARGETS = {"tiebreak": 7, "super_tiebreak": 10}
+
+class ScoringTable:
+    # The Match scoring rules for one (games_per_set, total_sets) format,
+    # compiled into a state-transition table. A state is the tuple
+    # (pts1, pts2, games1, games2, sets1, sets2, mode, winner) with mode an
+    # index into GAME_MODES and winner -1 while the match is running. Deuces
+    # in (super) tiebreaks are folded onto the lowest equivalent score, which
+    # keeps the table finite without changing any transition. The table is
+    # built by driving Match itself, so it agrees with it by construction.
+
+    def __init__(self, games_per_set=6, total_sets=3):
+        self.games_per_set = games_per_set
+        self.total_sets = total_sets
+
+        initial = self._read_state(Match("", "", games_per_set, total_sets))
+        states = [initial]
+        index = {initial: 0}
+        transitions = []
+        queue = deque([initial])
+        while queue:
+            state = queue.popleft()
+            row = []
+            for team_index in (0, 1):
+                following = self._step(state, team_index)
+                if following not in index:
+                    index[following] = len(states)
+                    states.append(following)
+                    queue.append(following)
+                row.append(index[following])
+            transitions.append(row)
+
+        self.states = states
+        self.index = index
+        self.initial_state = 0
+        columns = np.array(states, dtype=np.int16)
+        # Per-state columns.
+        self.points = columns[:, 0:2].astype(np.int8)
+        self.games = columns[:, 2:4].astype(np.int8)
+        self.sets = columns[:, 4:6].astype(np.int8)
+        self.modes = columns[:, 6].astype(np.int8)
+        self.winners = columns[:, 7].astype(np.int8)
+        # next_state[state, team_index] is the state after that team scores.
+        self.next_state = np.array(transitions, dtype=np.int32)
+        # resets_points[state, team_index]: the point closed a game, so the
+        # raw point counters start again from 0-0.
+        after = self.points[self.next_state]
+        running = self.winners == -1
+        self.resets_points = (after[..., 0] == 0) & (after[..., 1] == 0) & running[:, None]
+
+    def _read_state(self, match):
+        pts1, pts2 = match._points
+        mode = match.game_mode
+        if mode in TIEBREAK_TARGETS:
+            floor = TIEBREAK_TARGETS[mode] - 1
+            if pts1 >= floor and pts2 >= floor:
+                shift = min(pts1, pts2) - floor
+                pts1 -= shift
+                pts2 -= shift
+        winner = -1 if match._winner is None else match._winner
+        return (pts1, pts2, match._games[0], match._games[1],
+                match._sets[0], match._sets[1], GAME_MODES.index(mode), winner)
+
+    def _step(self, state, team_index):
+        pts1, pts2, games1, games2, sets1, sets2, mode, winner = state
+        if winner != -1:
+            return state
+        match = Match("", "", self.games_per_set, self.total_sets)
+        match._points[:] = [pts1, pts2]
+        match._games[:] = [games1, games2]
+        match._sets[:] = [sets1, sets2]
+        match.game_mode = GAME_MODES[mode]
+        match._score_point(team_index)
+        return self._read_state(match)
+
+    def state_id(self, match):
+        # Table state of a live Match.
+        return self.index[self._read_state(match)]
+
+    def replay(self, point_teams, per_point=True):
+        # Replay many point sequences at once. `point_teams` is a sequence of
+        # sequences of team indices, or a 2-D integer array padded with -1.
+        # Points scored after a match is over are ignored, as Match does.
+        # With per_point=False only the final results are returned.
+        teams = _as_padded_array(point_teams)
+        n_matches, n_points = teams.shape
+        state = np.full(n_matches, self.initial_state, dtype=np.int32)
+        raw_points = np.zeros((n_matches, 2), dtype=np.int32)
+        if per_point:
+            states = np.empty((n_matches, n_points), dtype=np.int32)
+            points = np.empty((n_matches, n_points, 2), dtype=np.int32)
+        points_played = np.zeros(n_matches, dtype=np.int32)
+        rows = np.arange(n_matches)
+        for t in range(n_points):
+            team = teams[:, t]
+            scored = (team >= 0) & (self.winners[state] == -1)
+            team = np.where(scored, team, 0)
+            following = np.where(scored, self.next_state[state, team], state)
+            reset = scored & self.resets_points[state, team]
+            raw_points[rows[scored], team[scored]] += 1
+            raw_points[reset] = 0
+            state = following
+            points_played += scored
+            if per_point:
+                states[:, t] = state
+                points[:, t] = raw_points
+        result = {
+            "winner": self.winners[state],
+            "points_played": points_played,
+            "final_state": state,
+        }
+        if per_point:
+            result.update({
+                "state": states,
+                "points": points,
+                "games": self.games[states],
+                "sets": self.sets[states],
+                "game_mode": self.modes[states],
+            })
+        return result
+
+def _as_padded_array(point_teams):
+    if isinstance(point_teams, np.ndarray) and point_teams.ndim == 2:
+        return point_teams.astype(np.int8, copy=False)
+    sequences = [np.asarray(sequence, dtype=np.int8) for sequence in point_teams]
+    width = max((len(sequence) for sequence in sequences), default=0)
+    teams = np.full((len(sequences), width), -1, dtype=np.int8)
+    for row, sequence in enumerate(sequences):
+        teams[row, :len(sequence)] = sequence
+    return teams
+
+@lru_cache(maxsize=None)
+def get_table(games_per_set=6, total_sets=3):
+    return ScoringTable(games_per_set, total_sets)
+
+def replay_batch(point_teams, games_per_set=6, total_sets=3, per_point=True):
+    return get_table(games_per_set, total_sets).replay(point_teams, per_point)
@@ -0,0 +1,108 @@
+from bisect import bisect_right
+
+import history_store
+from match import Match
+
+# Seek index of a stored match: the Match checkpoints taken at the start and
+# after every game, i.e. (points played, core state) pairs, plus the final
+# set scores. Jumping to any point restores the last checkpoint before it
+# (found by bisection) and replays at most one game.
+
+def build(match):
+    # Seek index of a finished Match, as stored by add_to_history.
+    return list(match._checkpoints), list(match.set_history)
+
+class SeekIndex:
+
+    def __init__(self, record, checkpoints, set_history):
+        # `record` is a history_store.load_point_record() record.
+        self.team1_name = record["team1_name"]
+        self.team2_name = record["team2_name"]
+        self.games_per_set, self.total_sets = history_store.candidate_formats(
+            record["games_per_set"], record["total_sets"], record["score"])[0]
+        self.point_teams, self.point_times = history_store.compact_points(record)
+        self.point_ms = history_store.compact_point_ms(record)
+        self._checkpoints = checkpoints
+        self._set_history = set_history
+        self._positions = [point_count for point_count, _ in checkpoints]
+        # Checkpoint index at the start of each set; the set count is the
+        # tenth field of a core state.
+        self._set_starts = []
+        for index, (_, core_state) in enumerate(checkpoints):
+            if core_state[9] == len(self._set_starts) and not core_state[7]:
+                self._set_starts.append(index)
+
+    @property
+    def points(self):
+        return len(self.point_teams)
+
+    @property
+    def games(self):
+        return len(self._checkpoints) - 1
+
+    @property
+    def sets(self):
+        return len(self._set_starts)
+
+    def at_point(self, point_count):
+        # The Match after its first `point_count` points.
+        if not 0 <= point_count <= self.points:
+            raise IndexError(f"point {point_count} is outside 0-{self.points}")
+        position = bisect_right(self._positions, point_count) - 1
+        checkpoint_count, core_state = self._checkpoints[position]
+        match = Match(self.team1_name, self.team2_name, self.games_per_set, self.total_sets)
+        match.set_history = list(self._set_history)
+        match._restore_core_state(core_state)
+        match.point_teams = self.point_teams[:checkpoint_count]
+        match.point_times = self.point_times[:checkpoint_count]
+        match.point_ms = self.point_ms[:checkpoint_count]
+        match._checkpoints = self._checkpoints[:position + 1]
+        match.added_to_history = True
+        for index in range(checkpoint_count, point_count):
+            match._record_point(self.point_teams[index], self.point_ms[index])
+        match._clock_ms = self.point_ms[point_count - 1] if point_count else 0
+        match._clock_resumed = None
+        return match
+
+    def at_game(self, game_number):
+        # The Match at the start of game `game_number` (from 1).
+        if not 1 <= game_number <= self.games:
+            raise IndexError(f"game {game_number} is outside 1-{self.games}")
+        return self.at_point(self._positions[game_number - 1])
+
+    def at_set(self, set_number):
+        # The Match at the start of set `set_number` (from 1; a deciding
+        # super tiebreak counts as a set).
+        if not 1 <= set_number <= self.sets:
+            raise IndexError(f"set {set_number} is outside 1-{self.sets}")
+        return self.at_point(self._positions[self._set_starts[set_number - 1]])
+
+    def states(self, start=0, stop=None):
+        # The Match after each of points start..stop, advancing one Match by
+        # a point at a time. The same object is yielded every time; copy it
+        # to keep a state.
+        stop = self.points if stop is None else stop
+        match = self.at_point(start)
+        yield match
+        for index in range(start, stop):
+            match._record_point(self.point_teams[index], self.point_ms[index])
+            match._clock_ms = self.point_ms[index]
+            yield match
+
+def load(match_id):
+    # SeekIndex of a stored match, or None if there is no such match.
+    # Matches stored without one (imported or older) are indexed on first use.
+    record = history_store.load_point_record(match_id)
+    if record is None:
+        return None
+    stored = history_store.load_seek_index(match_id)
+    if stored is None:
+        games_per_set, total_sets = history_store.candidate_formats(
+            record["games_per_set"], record["total_sets"], record["score"])[0]
+        match = Match(record["team1_name"], record["team2_name"], games_per_set, total_sets)
+        point_teams, _ = history_store.compact_points(record)
+        for team_index, ms in zip(point_teams, history_store.compact_point_ms(record)):
+            match._record_point(team_index, ms)
+        stored = build(match)
+        history_store.store_seek_index(match_id, stored)
+    return SeekIndex(record, *stored)
@@ -0,0 +1,166 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import history_store
+from scoring_table import get_table
+
+# Used when there is no recorded match to sample point durations from.
+DEFAULT_POINT_SECONDS = 30.0
+
+# Matches simulated per worker task.
+CHUNK_SIZE = 100000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def point_durations_from_history(max_matches=None):
+    # Seconds between consecutive points (and from the start to the first
+    # point) of the stored matches, newest first.
+    entries = history_store.latest(max_matches) if max_matches else history_store.summaries()
+    durations = []
+    for entry in entries:
+        points = history_store.load_points(entry["id"])
+        if points is None or not points[1]:
+            continue
+        durations.append(np.diff(np.asarray(points[1], dtype=np.float64), prepend=0.0))
+    if not durations:
+        return np.array([DEFAULT_POINT_SECONDS])
+    return np.concatenate(durations)
+
+def _simulate_chunk(n_matches, games_per_set, total_sets, serve_probabilities, point_durations, seed):
+    # Plays n_matches point by point in lock-step. Team 1 serves the first
+    # game and service alternates every game; in (super) tiebreaks it changes
+    # after the first point and then every two points.
+    table = get_table(games_per_set, total_sets)
+    rng = np.random.default_rng(seed)
+    serve_probabilities = np.asarray(serve_probabilities, dtype=np.float64)
+    point_durations = np.asarray(point_durations, dtype=np.float64)
+
+    # Per (state, scoring team) lookups, flattened to index by state * 2 + team.
+    following_mode = table.modes[table.next_state]
+    next_state = table.next_state.ravel()
+    resets_points = table.resets_points.ravel()
+    enters_tiebreak = ((following_mode == 1) & (table.modes != 1)[:, None]).ravel()
+    enters_super_tiebreak = ((following_mode == 2) & (table.modes != 2)[:, None]).ravel()
+    in_tiebreak = table.modes != 0
+    running_state = table.winners == -1
+
+    ids = np.arange(n_matches)
+    state = np.full(n_matches, table.initial_state, dtype=np.int32)
+    games = np.zeros(n_matches, dtype=np.int16)
+    game_points = np.zeros(n_matches, dtype=np.int16)
+    points = np.zeros(n_matches, dtype=np.int32)
+    tiebreaks = np.zeros(n_matches, dtype=np.int8)
+    super_tiebreaks = np.zeros(n_matches, dtype=np.int8)
+    results = {
+        "winner": np.empty(n_matches, dtype=np.int8),
+        "points": np.empty(n_matches, dtype=np.int32),
+        "games": np.empty(n_matches, dtype=np.int32),
+        "tiebreaks": np.empty(n_matches, dtype=np.int8),
+        "super_tiebreaks": np.empty(n_matches, dtype=np.int8),
+        "duration": np.empty(n_matches, dtype=np.float64),
+    }
+
+    while ids.size:
+        server = (games + np.where(in_tiebreak[state], (game_points + 1) // 2, 0)) & 1
+        server_wins = rng.random(ids.size) < serve_probabilities[server]
+        team = np.where(server_wins, server, 1 - server)
+        transition = state * 2 + team
+        reset = resets_points[transition]
+        tiebreaks += enters_tiebreak[transition]
+        super_tiebreaks += enters_super_tiebreak[transition]
+        games += reset
+        game_points += 1
+        game_points[reset] = 0
+        points += 1
+        state = next_state[transition]
+
+        # Finished states are absorbing, so finished matches can keep stepping
+        # harmlessly until the active arrays are compacted.
+        over = ~running_state[state]
+        finished = over & running_state[transition // 2]
+        if finished.any():
+            done = ids[finished]
+            final = state[finished]
+            played = points[finished]
+            results["winner"][done] = table.winners[final]
+            results["points"][done] = played
+            # A super tiebreak closes the match without resetting points.
+            results["games"][done] = games[finished] + (table.modes[final] == 2)
+            results["tiebreaks"][done] = tiebreaks[finished]
+            results["super_tiebreaks"][done] = super_tiebreaks[finished]
+            # Each match's duration is the sum of one sampled duration per point.
+            sampled = point_durations[rng.integers(0, len(point_durations), played.sum())]
+            results["duration"][done] = np.add.reduceat(sampled, np.cumsum(played) - played)
+            if np.count_nonzero(over) * 4 > ids.size or over.all():
+                running = ~over
+                ids, state, games, game_points = ids[running], state[running], games[running], game_points[running]
+                points, tiebreaks, super_tiebreaks = points[running], tiebreaks[running], super_tiebreaks[running]
+    return results
+
+def simulate(n_matches, games_per_set=6, total_sets=3, serve_probabilities=(0.6, 0.6),
+             point_durations=None, seed=None, workers=1):
+    # Simulate n_matches of one format. serve_probabilities[i] is the chance
+    # that team i wins a point on its own serve. point_durations are seconds
+    # per point to sample from (see point_durations_from_history). Work is
+    # split in CHUNK_SIZE tasks over `workers` processes.
+    if point_durations is None:
+        point_durations = np.array([DEFAULT_POINT_SECONDS])
+    chunk_sizes = [CHUNK_SIZE] * (n_matches // CHUNK_SIZE)
+    if n_matches % CHUNK_SIZE:
+        chunk_sizes.append(n_matches % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    args = [(size, games_per_set, total_sets, serve_probabilities, point_durations, chunk_seed)
+            for size, chunk_seed in zip(chunk_sizes, seeds)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_chunk(*chunk_args) for chunk_args in args]
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+def _distribution(values):
+    percentiles = np.percentile(values, PERCENTILES)
+    summary = {"mean": float(np.mean(values)), "std": float(np.std(values))}
+    summary.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)})
+    return summary
+
+def summarize(results):
+    return {
+        "matches": int(len(results["winner"])),
+        "team1_win_rate": float(np.mean(results["winner"] == 0)),
+        "points": _distribution(results["points"]),
+        "games": _distribution(results["games"]),
+        "duration_minutes": _distribution(results["duration"] / 60.0),
+        "tiebreak_rate": float(np.mean(results["tiebreaks"] > 0)),
+        "tiebreaks_per_match": float(np.mean(results["tiebreaks"])),
+        "super_tiebreak_rate": float(np.mean(results["super_tiebreaks"] > 0)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate match formats to plan court time.")
+    parser.add_argument("formats", nargs="*", default=["6x3", "6x1", "4x1"],
+                        help="formats as <games_per_set>x<total_sets>")
+    parser.add_argument("--matches", type=int, default=1000000)
+    parser.add_argument("--serve", type=float, nargs=2, default=(0.6, 0.6),
+                        metavar=("TEAM1", "TEAM2"), help="probability of winning a point on serve")
+    parser.add_argument("--from-history", action="store_true",
+                        help="sample point durations from the stored match history")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    point_durations = point_durations_from_history() if args.from_history else None
+    for match_format in args.formats:
+        games_per_set, total_sets = (int(part) for part in match_format.split("x"))
+        summary = summarize(simulate(args.matches, games_per_set, total_sets, args.serve,
+                                     point_durations, args.seed, args.workers))
+        print(f"{games_per_set} games per set, best of {total_sets}:")
+        print(f"  points        mean {summary['points']['mean']:.1f}  p5-p95 {summary['points']['p5']:.0f}-{summary['points']['p95']:.0f}")
+        print(f"  games         mean {summary['games']['mean']:.1f}  p5-p95 {summary['games']['p5']:.0f}-{summary['games']['p95']:.0f}")
+        print(f"  duration min  mean {summary['duration_minutes']['mean']:.1f}  p5-p95 {summary['duration_minutes']['p5']:.1f}-{summary['duration_minutes']['p95']:.1f}")
+        print(f"  tiebreaks     {summary['tiebreak_rate']:.1%} of matches, super tiebreaks {summary['super_tiebreak_rate']:.1%}")
+
+if __name__ == "__main__":
+    main()
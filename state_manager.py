@@ -1,33 +1,270 @@
 import pickle
 import os
+import struct
+import datetime
+import threading
+import uuid
+from contextlib import contextmanager
+import history_store
+import court_registry
+import team_stats
+import seek_index
+import metrics
+from court_registry import DEFAULT_COURT
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows) only the sessions of one process are serialized.
+    fcntl = None
 
 STATE_FILE = "match_state.pkl"
-HISTORY_FILE = "match_history.pkl"
+JOURNAL_FILE = "match_state.journal"
+# Every court except the default one keeps its files in COURTS_DIR/<court_id>/.
+COURTS_DIR = "courts"
+
+# One journal record per point: scoring team index (0 or 1) and the elapsed
+# match time in seconds. Records are fixed-size so appending one costs the
+# same however long the match runs. Undo and redo are journaled as records
+# with the JOURNAL_UNDO / JOURNAL_REDO marker in place of the team index.
+JOURNAL_RECORD = struct.Struct("<Bd")
+JOURNAL_UNDO = 2
+JOURNAL_REDO = 3
+
+# A journal starts with JOURNAL_MAGIC and a random token that the snapshot
+# records too, so a reader never replays one match's journal onto another's
+# snapshot. Journals written before the header existed have neither.
+JOURNAL_MAGIC = b"BTSBJRNL"
+JOURNAL_HEADER_SIZE = len(JOURNAL_MAGIC) + 16
+
+# Writers take the court's lock file; readers never lock. Files are replaced
+# atomically and the journal is append-only, so a reader always sees either
+# the old or the new state, never a partial write.
+LOCK_SUFFIX = ".lock"
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+def _court_paths(court_id):
+    # The default court keeps the original single-court file locations.
+    if court_id == DEFAULT_COURT:
+        return STATE_FILE, JOURNAL_FILE
+    court_dir = os.path.join(COURTS_DIR, court_registry.validate_court_id(court_id))
+    return os.path.join(court_dir, STATE_FILE), os.path.join(court_dir, JOURNAL_FILE)
 
-def load_state():
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "rb") as f:
+@contextmanager
+def _writer_lock(court_id):
+    state_file, _ = _court_paths(court_id)
+    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+    if fcntl is None:
+        with _thread_locks_lock:
+            lock = _thread_locks.setdefault(state_file, threading.Lock())
+        with lock:
+            yield
+        return
+    with open(state_file + LOCK_SUFFIX, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _write_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+@metrics.timed("state.load_state")
+def load_state(court_id=DEFAULT_COURT):
+    state_file, journal_file = _court_paths(court_id)
+    try:
+        with open(state_file, "rb") as f:
             state = pickle.load(f)
-        return state
+    except FileNotFoundError:
+        return None
+    if isinstance(state, tuple):
+        if len(state) == 3:
+            journal_token, journal_offset, state = state
+        else:
+            # Snapshot written before journals had a header.
+            journal_token = None
+            journal_offset, state = state
+        _replay_journal(state, journal_file, journal_token, journal_offset)
+    elif state is not None:
+        # A bare Match pickled before the journal existed. Rewrite it as a
+        # journaled snapshot, or the points journaled from now on would never
+        # be replayed onto it.
+        save_state(state, court_id)
+    return state
+
+def state_version(court_id=DEFAULT_COURT):
+    # Cheap change detector for pollers: a snapshot write changes the state
+    # file's mtime/size and every journaled point grows the journal. Costs two
+    # stat calls and never deserializes anything. None when no match exists.
+    state_file, journal_file = _court_paths(court_id)
+    try:
+        st = os.stat(state_file)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, _journal_size(journal_file))
+
+@metrics.timed("state.save_state")
+def save_state(state, court_id=DEFAULT_COURT):
+    # Write a full snapshot. Journal records past `journal_offset` are the
+    # points scored after this snapshot and are replayed by load_state.
+    state_file, journal_file = _court_paths(court_id)
+    with _writer_lock(court_id):
+        journal_token = _journal_token(journal_file) if state.point_teams else None
+        if journal_token is None:
+            # A new match (or a journal without a header) starts a new journal.
+            journal_token = uuid.uuid4().bytes
+            _write_atomic(journal_file, JOURNAL_MAGIC + journal_token)
+        journal_offset = _journal_size(journal_file)
+        _write_atomic(state_file, pickle.dumps((journal_token, journal_offset, state)))
+
+def save_point(state, team, court_id=DEFAULT_COURT):
+    # Score a point and persist it as a single journal record. A snapshot is
+    # only taken when a set or the match closes, to bound replay on load.
+    if team == state.team1_name:
+        save_point_index(state, 0, court_id)
+    elif team == state.team2_name:
+        save_point_index(state, 1, court_id)
+
+def save_point_index(state, team_index, court_id=DEFAULT_COURT):
+    points_before = len(state.point_teams)
+    sets_before = len(state.set_history)
+    was_paused = state.paused
+    state.add_point_index(team_index)
+    if len(state.point_teams) == points_before:
+        return
+    # The clock restarted by a point scored during a pause is only in the
+    # snapshot; journal records just carry the point's match time.
+    snapshot = state.match_over or was_paused or len(state.set_history) != sets_before
+    journal_change(state, team_index, state.point_ms[-1] / 1000, snapshot, court_id)
+
+def undo_point(state, court_id=DEFAULT_COURT):
+    # Undoing the final point restarts the clock, which needs a snapshot.
+    was_over = state.match_over
+    if not state.undo():
+        return False
+    journal_change(state, JOURNAL_UNDO, 0.0, was_over, court_id)
+    return True
+
+def redo_point(state, court_id=DEFAULT_COURT):
+    if not state.redo():
+        return False
+    journal_change(state, JOURNAL_REDO, 0.0, False, court_id)
+    return True
+
+def pause_match(state, court_id=DEFAULT_COURT):
+    # Stop the match clock for a break. Pauses are rare, so they are saved
+    # as a snapshot rather than journaled.
+    if not state.pause():
+        return False
+    save_state(state, court_id)
+    return True
+
+def resume_match(state, court_id=DEFAULT_COURT):
+    if not state.resume():
+        return False
+    save_state(state, court_id)
+    return True
+
+@metrics.timed("state.journal_change")
+def journal_change(state, marker, seconds, snapshot, court_id=DEFAULT_COURT):
+    # Persist a change already applied to `state`: a point for team index
+    # `marker` at `seconds`, or JOURNAL_UNDO / JOURNAL_REDO. With `snapshot`
+    # a full snapshot is written as well.
+    _, journal_file = _court_paths(court_id)
+    with _writer_lock(court_id):
+        with open(journal_file, "ab") as f:
+            f.write(JOURNAL_RECORD.pack(marker, seconds))
+    if snapshot:
+        save_state(state, court_id)
+
+def clear_state(court_id=DEFAULT_COURT):
+    with _writer_lock(court_id):
+        for path in _court_paths(court_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+def _journal_token(journal_file):
+    # The token of a journal with a header, else None.
+    try:
+        with open(journal_file, "rb") as f:
+            header = f.read(JOURNAL_HEADER_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(header) == JOURNAL_HEADER_SIZE and header.startswith(JOURNAL_MAGIC):
+        return header[len(JOURNAL_MAGIC):]
     return None
 
-def save_state(state):
-    with open(STATE_FILE, "wb") as f:
-        pickle.dump(state, f)
+def _journal_size(journal_file):
+    try:
+        return os.path.getsize(journal_file)
+    except FileNotFoundError:
+        return 0
 
-def clear_state():
-    if os.path.exists(STATE_FILE):
-        os.remove(STATE_FILE)
+def _replay_journal(state, journal_file, journal_token, journal_offset):
+    try:
+        f = open(journal_file, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        header = f.read(JOURNAL_HEADER_SIZE)
+        has_header = len(header) == JOURNAL_HEADER_SIZE and header.startswith(JOURNAL_MAGIC)
+        if journal_token is None:
+            if has_header:
+                return
+        elif not has_header or header[len(JOURNAL_MAGIC):] != journal_token:
+            # The journal already belongs to a newer match.
+            return
+        f.seek(journal_offset)
+        data = f.read()
+    # Ignore a trailing partial record left by an interrupted append.
+    data = data[:len(data) - len(data) % JOURNAL_RECORD.size]
+    for marker, seconds in JOURNAL_RECORD.iter_unpack(data):
+        if marker == JOURNAL_UNDO:
+            state.undo()
+        elif marker == JOURNAL_REDO:
+            state.redo()
+        else:
+            state.add_point_index(marker, datetime.timedelta(seconds=seconds))
 
+@metrics.timed("state.load_history")
 def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "rb") as f:
-            history = pickle.load(f)
-        return history
-    return []
+    # Full history including every point timeline. Prefer the history_store
+    # queries (latest, find, load_point_history) for anything on a hot path.
+    history = history_store.summaries()
+    for entry in history:
+        entry["point_history"] = history_store.load_point_history(entry["id"])
+    return history
 
+def record_finished_match(state, court_id=DEFAULT_COURT):
+    # Add a finished match to the history and persist that it was added.
+    if state is None or not state.match_over or state.added_to_history:
+        return
+    add_to_history(state)
+    state.added_to_history = True
+    save_state(state, court_id)
+
+@metrics.timed("state.add_to_history")
 def add_to_history(match):
-    history = load_history()
+    entry = history_entry(match)
+    # The point timeline is stored in its compact form.
+    # Stored once per match uid, whichever session gets here first.
+    match_id = history_store.append(entry, match.team1_name, match.team2_name,
+                                    match.games_per_set, match.total_sets,
+                                    match.point_teams, match.point_times, match.uid, match.point_ms)
+    team_stats.record_match(match_id, match, entry["duration"])
+    history_store.store_seek_index(match_id, seek_index.build(match))
+    return match_id
+
+def history_entry(match):
+    # Summary row of a finished match as shown in the history table.
     team1_sets = match.sets_won.get(match.team1_name, 0)
     team2_sets = match.sets_won.get(match.team2_name, 0)
     # Build a string of the finished set scores.
@@ -46,8 +283,5 @@ def add_to_history(match):
          "team2": t2,
          "score": score_str,
          "duration": match.get_match_time(),
-         "point_history": match.point_history  # full timeline of point events.
     }
-    history.append(entry)
-    with open(HISTORY_FILE, "wb") as f:
-         pickle.dump(history, f)
\ No newline at end of file
+    return entry
@@ -0,0 +1,254 @@
+import argparse
+
+import history_store
+from match import Match, parse_match_time
+
+# Per-team totals over every recorded match, kept in the history database.
+# add_to_history adds each finished match to its two rows, so reading the
+# standings never touches the match history itself.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS team_stats (
+    team_key TEXT PRIMARY KEY,
+    team_name TEXT NOT NULL,
+    matches INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    sets_won INTEGER NOT NULL,
+    sets_lost INTEGER NOT NULL,
+    games_won INTEGER NOT NULL,
+    games_lost INTEGER NOT NULL,
+    tiebreaks_won INTEGER NOT NULL,
+    tiebreaks_lost INTEGER NOT NULL,
+    points_won INTEGER NOT NULL,
+    points_lost INTEGER NOT NULL,
+    serve_points INTEGER NOT NULL,
+    serve_points_won INTEGER NOT NULL,
+    longest_serve_streak INTEGER NOT NULL,
+    duration_seconds INTEGER NOT NULL
+);
+-- History match ids counted in team_stats, so a match is never counted
+-- twice, in whatever order matches are recorded.
+CREATE TABLE IF NOT EXISTS team_stats_matches (
+    match_id INTEGER PRIMARY KEY
+);
+"""
+
+# Columns added up match after match; longest_serve_streak keeps the maximum.
+SUM_COLUMNS = ("matches", "wins", "losses", "sets_won", "sets_lost", "games_won", "games_lost",
+               "tiebreaks_won", "tiebreaks_lost", "points_won", "points_lost",
+               "serve_points", "serve_points_won", "duration_seconds")
+COLUMNS = ("team_key", "team_name") + SUM_COLUMNS + ("longest_serve_streak",)
+
+INSERT = f"INSERT INTO team_stats ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+UPSERT = (
+    INSERT + " ON CONFLICT (team_key) DO UPDATE SET team_name = excluded.team_name, "
+    + ", ".join(f"{column} = {column} + excluded.{column}" for column in SUM_COLUMNS)
+    + ", longest_serve_streak = MAX(longest_serve_streak, excluded.longest_serve_streak)"
+)
+
+def display_name(team_name):
+    # A team name without the winner's " 🎾" suffix or stray spaces.
+    if team_name.endswith(" 🎾"):
+        team_name = team_name[:-2]
+    return " ".join(team_name.split())
+
+def team_key(team_name):
+    # Identity of a team across matches, ignoring case as well.
+    return display_name(team_name).casefold()
+
+def _connect():
+    conn = history_store._connect()
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'team_stats_matches'"
+    ).fetchone()
+    if not exists:
+        # Create the tables and count the matches recorded before they
+        # existed in one transaction: if counting fails, nothing is created
+        # and the next connection tries again. Totals kept against a highest
+        # match id may have missed matches recorded out of order, so they are
+        # recomputed too.
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'team_stats_matches'"
+                ).fetchone()
+                if not exists:
+                    for statement in SCHEMA.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute("DROP TABLE IF EXISTS team_stats_progress")
+                    _replace_totals(conn)
+        except BaseException:
+            conn.close()
+            raise
+    return conn
+
+def match_stats(games_per_set, total_sets, point_teams):
+    # Replay a match and count, per team index: games, tiebreaks (super
+    # tiebreaks included) and points won, points played and won on serve, and
+    # the longest run of consecutive points won on serve. Team 1 serves
+    # first and service alternates every game; in tiebreaks it changes after
+    # the first point and then every two points.
+    replay = Match("", "", games_per_set, total_sets)
+    points = replay._points
+    stats = {key: [0, 0] for key in ("games", "tiebreaks", "points", "serve_points",
+                                     "serve_points_won", "longest_serve_streak")}
+    games, tiebreaks = stats["games"], stats["tiebreaks"]
+    serve_points, serve_points_won = stats["serve_points"], stats["serve_points_won"]
+    longest_streak = stats["longest_serve_streak"]
+    games_played = 0
+    streak_server = streak = 0
+    for team_index in point_teams:
+        mode = replay.game_mode
+        if mode == "regular":
+            server = games_played & 1
+        else:
+            server = (games_played + (points[0] + points[1] + 1) // 2) & 1
+        serve_points[server] += 1
+        if server != streak_server:
+            streak_server = server
+            streak = 0
+        if team_index == server:
+            serve_points_won[server] += 1
+            streak += 1
+            if streak > longest_streak[server]:
+                longest_streak[server] = streak
+        else:
+            streak = 0
+        stats["points"][team_index] += 1
+        replay._score_point(team_index)
+        if points[0] == points[1] == 0 or replay.match_over:
+            games_played += 1
+            if mode != "super_tiebreak":
+                games[team_index] += 1
+            if mode != "regular":
+                tiebreaks[team_index] += 1
+    stats["sets"] = list(replay._sets)
+    stats["winner"] = replay._winner
+    return stats
+
+def _team_rows(team1_name, team2_name, winner, stats, duration_seconds):
+    rows = []
+    for team_index, team_name in enumerate((team1_name, team2_name)):
+        other = 1 - team_index
+        won = int(winner == team_index)
+        rows.append((
+            team_key(team_name), display_name(team_name),
+            1, won, 1 - won,
+            stats["sets"][team_index], stats["sets"][other],
+            stats["games"][team_index], stats["games"][other],
+            stats["tiebreaks"][team_index], stats["tiebreaks"][other],
+            stats["points"][team_index], stats["points"][other],
+            stats["serve_points"][team_index], stats["serve_points_won"][team_index],
+            duration_seconds, stats["longest_serve_streak"][team_index],
+        ))
+    return rows
+
+def record_match(match_id, match, duration):
+    # Add finished match `match_id` of the history to its teams' rows.
+    # `duration` is the match time as stored in the history ("H:MM:SS").
+    stats = match_stats(match.games_per_set, match.total_sets, match.point_teams)
+    rows = _team_rows(match.team1_name, match.team2_name, match._winner, stats,
+                      parse_match_time(duration))
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            counted = conn.execute("INSERT OR IGNORE INTO team_stats_matches (match_id) VALUES (?)",
+                                   (match_id,))
+            if counted.rowcount == 0:
+                return
+            conn.executemany(UPSERT, rows)
+    finally:
+        conn.close()
+
+def _record_rows(record):
+    # Team rows of a stored match, guessing the format of legacy matches.
+    # Legacy matches whose points or score cannot be read have none.
+    try:
+        point_teams, _ = history_store.compact_points(record)
+        formats = history_store.candidate_formats(record["games_per_set"], record["total_sets"],
+                                                  record["score"])
+        duration_seconds = parse_match_time(record["duration"])
+    except (KeyError, ValueError):
+        return []
+    for games_per_set, total_sets in formats:
+        stats = match_stats(games_per_set, total_sets, point_teams)
+        if stats["winner"] is not None:
+            break
+    return _team_rows(record["team1_name"], record["team2_name"], stats["winner"], stats,
+                      duration_seconds)
+
+def _totals(conn):
+    # Every team's row summed over the full match history, reading one match
+    # at a time. Returns (rows by team key, match ids counted).
+    totals = {}
+    match_ids = []
+    for record in history_store.iter_point_records(conn=conn):
+        for row in _record_rows(record):
+            total = totals.get(row[0])
+            if total is None:
+                totals[row[0]] = list(row)
+            else:
+                total[1] = row[1]
+                for column in range(2, len(row) - 1):
+                    total[column] += row[column]
+                total[-1] = max(total[-1], row[-1])
+        match_ids.append(record["id"])
+    return totals, match_ids
+
+def _write_totals(conn):
+    # Replace the rows by totals over the whole history, in one transaction
+    # so no match is recorded in between.
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _replace_totals(conn)
+
+def _replace_totals(conn):
+    totals, match_ids = _totals(conn)
+    conn.execute("DELETE FROM team_stats")
+    conn.executemany(INSERT, totals.values())
+    conn.execute("DELETE FROM team_stats_matches")
+    conn.executemany("INSERT INTO team_stats_matches (match_id) VALUES (?)",
+                     ((match_id,) for match_id in match_ids))
+
+def rebuild():
+    # Recompute every team's row from scratch.
+    conn = _connect()
+    try:
+        _write_totals(conn)
+    finally:
+        conn.close()
+
+def leaderboard():
+    # Every team's totals, most wins first.
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM team_stats"
+            " ORDER BY wins DESC, sets_won - sets_lost DESC, games_won - games_lost DESC, team_name"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+def team_totals(team_name):
+    # One team's totals (as in leaderboard()), or None if it has no match.
+    conn = _connect()
+    try:
+        row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM team_stats WHERE team_key = ?",
+                           (team_key(team_name),)).fetchone()
+    finally:
+        conn.close()
+    return None if row is None else dict(zip(COLUMNS, row))
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the team statistics behind the leaderboard.")
+    parser.add_argument("command", choices=("rebuild",))
+    parser.parse_args()
+    rebuild()
+    print(f"Rebuilt statistics of {len(leaderboard())} teams")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import csv
+import os
+import pickle
+
+import archive
+import history_store
+import state_manager
+import team_stats
+from match import Match
+
+def _finished_match(team_index):
+    match = Match("Ana", "Bia", 4, 1)
+    for _ in range(16):
+        match._record_point(team_index, 1000)
+    return match
+
+def _store_matches():
+    # A match from the legacy pickle, without a uid, and two recorded live.
+    legacy = _finished_match(1)
+    entry = state_manager.history_entry(legacy)
+    entry["point_history"] = legacy.point_history
+    with open(history_store.LEGACY_HISTORY_FILE, "wb") as f:
+        pickle.dump([entry], f)
+    for team_index in (0, 1):
+        state_manager.add_to_history(_finished_match(team_index))
+
+def test_reimport_stores_and_counts_nothing(workdir, monkeypatch):
+    _store_matches()
+    assert archive.export_archive("exported") == 3
+
+    rebuilds = []
+    monkeypatch.setattr(team_stats, "rebuild", lambda: rebuilds.append(True))
+    assert archive.import_archive("exported") == (0, [])
+    assert rebuilds == []
+    assert len(history_store.summaries()) == 3
+
+def _rewrite_ids(path, extra_rows=()):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    for row in rows[1:]:
+        row[0] = f"M{row[0]}"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows + list(extra_rows))
+
+def test_import_merges_non_numeric_ids(workdir):
+    _store_matches()
+    assert archive.export_archive("exported") == 3
+    _rewrite_ids(os.path.join("exported", archive.MATCHES_FILE))
+    _rewrite_ids(os.path.join("exported", archive.POINTS_FILE), [("X1", 1, 1, 1, 1000)])
+    os.remove(history_store.HISTORY_DB)
+    os.remove(history_store.LEGACY_HISTORY_FILE)
+    imported, errors = archive.import_archive("exported")
+    assert imported == 3
+    assert errors == ["points of match X1: not in matches.csv or out of its order"]
@@ -0,0 +1,12 @@
+import pytest
+
+import court_registry
+
+@pytest.mark.parametrize("court_id", ["abc\n", "abc\r\n", "", "a/b", "../main", "x" * 33])
+def test_invalid_court_ids(court_id):
+    with pytest.raises(ValueError):
+        court_registry.validate_court_id(court_id)
+
+@pytest.mark.parametrize("court_id", ["main", "c2", "Court_1-A", "x" * 32])
+def test_valid_court_ids(court_id):
+    assert court_registry.validate_court_id(court_id) == court_id
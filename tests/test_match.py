@@ -0,0 +1,48 @@
+import pickle
+
+import match as match_module
+from match import Match
+
+class FakeClocks:
+    def __init__(self, monotonic_ms, wall_ms):
+        self.monotonic_ms = monotonic_ms
+        self.wall_ms = wall_ms
+
+    def advance(self, ms):
+        self.monotonic_ms += ms
+        self.wall_ms += ms
+
+def _use(monkeypatch, clocks):
+    monkeypatch.setattr(match_module, "_monotonic_ms", lambda: clocks.monotonic_ms)
+    monkeypatch.setattr(match_module, "_wall_ms", lambda: clocks.wall_ms)
+
+def test_match_clock_survives_a_restart(monkeypatch):
+    clocks = FakeClocks(5_000_000, 1_700_000_000_000)
+    _use(monkeypatch, clocks)
+    match = Match("Ana", "Bia")
+    clocks.advance(200)
+    match.add_point_index(0)
+    clocks.advance(300)
+    data = pickle.dumps(match)
+
+    # After a restart the monotonic clock starts again near zero; 1 s of
+    # wall-clock time passes in between.
+    for monotonic_ms in (10, 9_000_000):
+        restarted = FakeClocks(monotonic_ms, clocks.wall_ms + 1000)
+        _use(monkeypatch, restarted)
+        loaded = pickle.loads(data)
+        assert loaded.elapsed_ms() == 1500
+        restarted.advance(100)
+        loaded.add_point_index(1)
+        assert list(loaded.point_ms) == [200, 1600]
+
+def test_paused_clock_stays_paused(monkeypatch):
+    clocks = FakeClocks(5_000_000, 1_700_000_000_000)
+    _use(monkeypatch, clocks)
+    match = Match("Ana", "Bia")
+    clocks.advance(700)
+    match.pause()
+    data = pickle.dumps(match)
+    _use(monkeypatch, FakeClocks(10, clocks.wall_ms + 60_000))
+    loaded = pickle.loads(data)
+    assert loaded.paused and loaded.elapsed_ms() == 700
@@ -0,0 +1,27 @@
+import random
+
+import point_timing
+from match import Match
+
+def test_advanced_timer_matches_a_full_replay():
+    rng = random.Random(7)
+    match = Match("Ana", "Bia", 4, 3)
+    timer = None
+    ms = 0
+    for step in range(150):
+        if match.match_over:
+            break
+        if step % 23 == 22:
+            match.undo()
+        else:
+            ms += rng.randrange(5000, 40000)
+            match._record_point(rng.randrange(2), ms)
+        previous = timer
+        timer = point_timing.advance_timer(timer, match)
+        assert timer.summary() == point_timing.match_timer(match).summary()
+        if step % 23 not in (22, 0):
+            # Only the new point was fed to the same timer.
+            assert timer is previous
+    assert match.match_over
+    other = Match("Cris", "Duda", 4, 3)
+    assert point_timing.advance_timer(timer, other).points == 0
@@ -0,0 +1,26 @@
+import pickle
+
+import history_store
+import rescore
+from match import Match
+from state_manager import history_entry
+
+def _legacy_entry(team1_name, team2_name):
+    match = Match(team1_name, team2_name, 4, 1)
+    for _ in range(16):
+        match._record_point(0, 1000)
+    entry = history_entry(match)
+    entry["point_history"] = match.point_history
+    return entry
+
+def test_unreadable_history_rows_are_invalid(workdir):
+    # Legacy rows naming a scoring team with the winner's " 🎾", or with an
+    # event missing its time, next to a readable one.
+    missing_time = _legacy_entry("Cris", "Duda")
+    del missing_time["point_history"][3]["time"]
+    entries = [_legacy_entry("Team 🎾 Rio", "Bia"), missing_time, _legacy_entry("Ana", "Bia")]
+    with open(history_store.LEGACY_HISTORY_FILE, "wb") as f:
+        pickle.dump(entries, f)
+    results = list(rescore.rescore_all(rescore.history_records()))
+    assert [result["status"] for result in results] == [rescore.INVALID, rescore.INVALID, rescore.OK]
+    assert results[0]["message"].startswith("unreadable point history")
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import history_store
+import score_service
+import state_manager
+
+async def _request(port, method, path, body=None):
+    # One request over its own connection: (status, decoded JSON body).
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + data)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), json.loads(content)
+
+async def _raw_request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ", 2)[1])
+
+async def _next_event(reader):
+    while True:
+        line = await reader.readline()
+        if line.startswith(b"data: "):
+            return json.loads(line[len(b"data: "):])
+
+def _run(test):
+    async def main():
+        service = score_service.ScoreService("en")
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            await test(service, port)
+        finally:
+            server.close()
+            await server.wait_closed()
+    asyncio.run(main())
+
+def test_point_is_pushed_and_persisted(workdir):
+    async def test(service, port):
+        status, _ = await _request(port, "POST", "/courts/c1/match",
+                                   {"team1": "Ana", "team2": "Bia", "games_per_set": 4, "total_sets": 1})
+        assert status == 200
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /courts/c1/events HTTP/1.1\r\n\r\n")
+        assert (await _next_event(reader))["match"]["points"] == ["0", "0"]
+
+        status, score = await _request(port, "POST", "/courts/c1/point?team=2")
+        assert status == 200 and score["match"]["points"] == ["0", "15"]
+        pushed = await asyncio.wait_for(_next_event(reader), 5)
+        assert pushed["match"]["points"] == ["0", "15"]
+        writer.close()
+
+        await service.flush()
+        assert list(state_manager.load_state("c1").point_teams) == [1]
+
+        # Finish the match: the snapshot and the history are written too.
+        for _ in range(15):
+            await _request(port, "POST", "/courts/c1/point", {"team": 2})
+        await service.flush()
+        match = state_manager.load_state("c1")
+        assert match.match_over and match.winner == "Bia" and len(match.point_teams) == 16
+        assert [entry["team2"] for entry in history_store.latest(1)] == ["Bia 🎾"]
+    _run(test)
+
+def test_bad_requests_get_400(workdir):
+    async def test(service, port):
+        for total_sets in (0, -1, "x"):
+            status, _ = await _request(port, "POST", "/courts/c1/match", {"total_sets": total_sets})
+            assert status == 400
+        assert await _raw_request(port, b"GARBAGE\r\n\r\n") == 400
+        assert await _raw_request(port, b"POST /courts/c1/undo HTTP/1.1\r\nContent-Length: x\r\n\r\n") == 400
+        # The service still answers.
+        status, score = await _request(port, "GET", "/courts/c1/score")
+        assert status == 200 and score["match"] is None
+    _run(test)
+
+def test_recorded_match_cannot_be_undone(workdir):
+    async def test(service, port):
+        await _request(port, "POST", "/courts/c1/match",
+                       {"team1": "Ana", "team2": "Bia", "games_per_set": 4, "total_sets": 1})
+        for _ in range(16):
+            await _request(port, "POST", "/courts/c1/point", {"team": 1})
+        status, _ = await _request(port, "POST", "/courts/c1/undo")
+        assert status == 409
+        await service.flush()
+        assert state_manager.load_state("c1").match_over
+        assert [entry["team1"] for entry in history_store.latest(2)] == ["Ana 🎾"]
+    _run(test)
+
+def test_failed_write_stops_the_court(workdir, monkeypatch):
+    async def test(service, port):
+        await _request(port, "POST", "/courts/c1/match", {"team1": "Ana", "team2": "Bia"})
+        await service.flush()
+
+        def fail(*args):
+            raise OSError("disk full")
+        journal_change = state_manager.journal_change
+        monkeypatch.setattr(state_manager, "journal_change", fail)
+        status, _ = await _request(port, "POST", "/courts/c1/point", {"team": 1})
+        assert status == 200
+        await service.flush()
+        monkeypatch.setattr(state_manager, "journal_change", journal_change)
+        for action in ("point", "undo", "pause"):
+            status, _ = await _request(port, "POST", f"/courts/c1/{action}", {"team": 1})
+            assert status == 503
+        status, score = await _request(port, "GET", "/courts/c1/score")
+        assert status == 200 and score["match"]["points_played"] == 1
+        # Other courts are unaffected.
+        status, _ = await _request(port, "POST", "/courts/c2/match", {"team1": "Ana", "team2": "Bia"})
+        assert status == 200
+    _run(test)
@@ -0,0 +1,23 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import state_manager
+from match import Match
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+def _score_track():
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    at.sidebar.radio[0].set_value("score_track").run()
+    return at
+
+def test_teams_with_the_same_name(workdir):
+    state_manager.save_state(Match("Same", "Same", 4, 1))
+    at = _score_track()
+    assert not at.exception
+    at.button(key="point-1").click().run()
+    assert not at.exception
+    assert list(state_manager.load_state().point_teams) == [1]
+    points = [metric.value for metric in at.metric if metric.label == "Points"]
+    assert points == ["0", "15"]
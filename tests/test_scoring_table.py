@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from match import Match
+from scoring_table import GAME_MODES, get_table
+
+FORMATS = [(1, 1), (2, 3), (4, 1), (4, 3), (6, 1), (6, 3), (6, 5), (9, 2)]
+
+def _sequences(rng, count):
+    # Point sequences from close to one-sided, long enough to finish most
+    # matches; some stop part-way.
+    sequences = []
+    for _ in range(count):
+        share = rng.choice((0.5, 0.5, 0.6, 0.8))
+        length = rng.randrange(1, 400)
+        sequences.append([int(rng.random() >= share) for _ in range(length)])
+    return sequences
+
+@pytest.mark.parametrize("games_per_set,total_sets", FORMATS)
+def test_replay_agrees_with_match(games_per_set, total_sets):
+    rng = random.Random(games_per_set * 10 + total_sets)
+    sequences = _sequences(rng, 60)
+    table = get_table(games_per_set, total_sets)
+    result = table.replay(sequences)
+    for row, sequence in enumerate(sequences):
+        match = Match("", "", games_per_set, total_sets)
+        played = 0
+        for t, team_index in enumerate(sequence):
+            if match.match_over:
+                break
+            match._score_point(team_index)
+            played += 1
+            assert list(result["points"][row, t]) == match._points
+            assert list(result["games"][row, t]) == match._games
+            assert list(result["sets"][row, t]) == match._sets
+            assert GAME_MODES[result["game_mode"][row, t]] == match.game_mode
+        expected_winner = -1 if match._winner is None else match._winner
+        assert result["winner"][row] == expected_winner
+        assert result["points_played"][row] == played
+        assert result["final_state"][row] == table.state_id(match)
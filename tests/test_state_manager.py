@@ -0,0 +1,98 @@
+import datetime
+import glob
+import os
+import random
+import shutil
+
+import court_registry
+import live_cache
+import state_manager
+from conftest import DATA_DIR
+from match import Match
+
+def test_baseline_snapshot_keeps_journaled_points(workdir):
+    # A match_state.pkl written before the journal existed: a bare Match,
+    # mid-match, with 60 points.
+    shutil.copy(os.path.join(DATA_DIR, "baseline_match_state.pkl"), state_manager.STATE_FILE)
+    match = state_manager.load_state()
+    assert len(match.point_teams) == 60
+    state_manager.save_point_index(match, 0)
+    reloaded = state_manager.load_state()
+    assert len(reloaded.point_teams) == 61
+    assert reloaded.point_teams[-1] == 0
+    state_manager.save_point_index(reloaded, 1)
+    assert list(state_manager.load_state().point_teams[-2:]) == [0, 1]
+
+def _registry_files():
+    return {path: os.stat(path).st_mtime_ns for path in glob.glob(court_registry.COURTS_DB + "*")}
+
+def test_scoring_does_not_write_the_court_registry(workdir):
+    court_registry.register_court("c2")
+    registry_files = _registry_files()
+    for court_id in (court_registry.DEFAULT_COURT, "c2"):
+        match = Match("Ana", "Bia", 4, 1)
+        state_manager.save_state(match, court_id)
+        state_manager.save_point_index(match, 0, court_id)
+        state_manager.undo_point(match, court_id)
+        state_manager.clear_state(court_id)
+    assert _registry_files() == registry_files
+
+def test_overview_reads_each_courts_state(workdir):
+    live_cache._boards.clear()
+    live_cache._shared.clear()
+    court_registry.register_court("c2")
+    match = Match("Ana", "Bia", 4, 1)
+    state_manager.save_state(match, "c2")
+    state_manager.save_point_index(match, 1, "c2")
+    html = live_cache.courts_table("en")
+    assert "<td>c2</td><td>Ana</td><td>Bia</td>" in html
+    assert "<td>0-15</td>" in html
+
+def test_overview_shows_the_match_clock(workdir):
+    live_cache._boards.clear()
+    live_cache._shared.clear()
+    court_registry.register_court("c2")
+    match = Match("Ana", "Bia", 4, 1)
+    # Started two hours ago, with 65 seconds played before a break.
+    match.start_time -= datetime.timedelta(hours=2)
+    match.pause()
+    match._clock_ms = 65000
+    state_manager.save_state(match, "c2")
+    assert "<td>0:01:05 ⏸</td>" in live_cache.courts_table("en")
+
+def _replayed(match):
+    # The same points scored from scratch, without undo, redo or pauses.
+    replayed = Match(match.team1_name, match.team2_name, match.games_per_set, match.total_sets)
+    for team_index, ms in zip(match.point_teams, match.point_ms):
+        replayed._record_point(team_index, ms)
+    return replayed
+
+def test_journaled_edits_reload_as_a_replay(workdir):
+    rng = random.Random(7)
+    for games_per_set, total_sets in ((1, 1), (2, 3), (4, 1)):
+        match = Match("Ana", "Bia", games_per_set, total_sets)
+        state_manager.save_state(match)
+        for step in range(400):
+            action = rng.random()
+            if action < 0.55:
+                state_manager.save_point_index(match, rng.randrange(2))
+            elif action < 0.75:
+                state_manager.undo_point(match)
+            elif action < 0.9:
+                state_manager.redo_point(match)
+            elif action < 0.95:
+                state_manager.pause_match(match)
+            else:
+                state_manager.resume_match(match)
+            reloaded = state_manager.load_state()
+            replayed = _replayed(match)
+            for other in (reloaded, replayed):
+                assert list(other.point_teams) == list(match.point_teams)
+                assert list(other.point_ms) == list(match.point_ms)
+                assert other._core_state() == match._core_state()
+                assert other.set_history == match.set_history
+            assert reloaded._redo == match._redo
+            assert reloaded.paused == match.paused
+            if step % 50 == 49:
+                # Carry on from the reloaded state, as a restarted app would.
+                match = reloaded
@@ -0,0 +1,21 @@
+import pytest
+
+import state_manager
+import win_probability
+from match import Match
+
+def _play(team1_name, team2_name, point_teams):
+    match = Match(team1_name, team2_name, 4, 1)
+    for team_index in point_teams:
+        match._record_point(team_index, 1000)
+    return match
+
+def test_point_probability_uses_the_teams_history(workdir):
+    assert win_probability.estimate_point_probability_from_history("Ana", "Bia") == 0.5
+    state_manager.add_to_history(_play("Ana", "Bia", [0, 0, 0, 1] * 16))
+    # Team names are matched as the leaderboard matches them.
+    prior = win_probability.estimate_point_probability_from_history(" ana", "BIA")
+    assert prior > 0.6
+    match = Match("ANA", "bia", 4, 1)
+    assert win_probability.estimate_point_probability(match) == prior
+    assert win_probability.estimate_point_probability_from_history("Bia", "Ana") == pytest.approx(1 - prior)
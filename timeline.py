@@ -0,0 +1,50 @@
+import datetime
+
+import pandas as pd
+
+import history_store
+from match import replay_score_columns
+
+TIMELINE_COLUMNS = ("Game Time", "Team Scored", "Game Score", "Set Score", "Match Score")
+
+def build_timeline(match_id):
+    # Point-by-point timeline of a stored match as a DataFrame, built a
+    # column at a time.
+    record = history_store.load_point_record(match_id)
+    if record is None:
+        return pd.DataFrame(columns=list(TIMELINE_COLUMNS))
+    if "point_history" in record:
+        return _timeline_from_events(record["point_history"], record["team1_name"], record["team2_name"])
+    return _timeline_from_points(record)
+
+def _timeline_from_points(record):
+    scores = replay_score_columns(record["games_per_set"], record["total_sets"], record["point_teams"])
+    teams = (record["team1_name"], record["team2_name"])
+    return pd.DataFrame({
+        "Game Time": [str(datetime.timedelta(seconds=seconds)) for seconds in record["point_times"]],
+        "Team Scored": [teams[team_index] for team_index in record["point_teams"]],
+        "Game Score": _join_scores(scores["points1"], scores["points2"]),
+        "Set Score": _join_scores(scores["games1"], scores["games2"]),
+        "Match Score": _join_scores(scores["sets1"], scores["sets2"]),
+    }, columns=list(TIMELINE_COLUMNS))
+
+def _join_scores(team1_scores, team2_scores):
+    return [f"{score1}-{score2}" for score1, score2 in zip(team1_scores, team2_scores)]
+
+def _timeline_from_events(point_history, team1_name, team2_name):
+    def scores(key):
+        return [
+            f"{event.get(key, {}).get(team1_name, 0)}-{event.get(key, {}).get(team2_name, 0)}"
+            for event in point_history
+        ]
+
+    return pd.DataFrame({
+        "Game Time": [event.get("time", "") for event in point_history],
+        "Team Scored": [event.get("scoring_team", "") for event in point_history],
+        "Game Score": scores("current_game_score"),
+        "Set Score": scores("current_set_score"),
+        "Match Score": scores("current_match_score"),
+    }, columns=list(TIMELINE_COLUMNS))
+
+def timeline_csv(timeline):
+    return timeline.to_csv(index=False).encode("utf-8")
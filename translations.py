@@ -29,6 +29,47 @@ translations = {
         "match_over": "Match Over! Winner: ",
         "match_in_progress_status": "Match in progress",
         "current_time": "Current Time: ",
+        "court": "Court",
+        "new_court": "New court id",
+        "add_court": "Add Court",
+        "invalid_court": "Court ids may only use letters, digits, '-' and '_'.",
+        "all_courts": "All courts",
+        "no_active_courts": "No active courts.",
+        "win_probability": "Win probability: ",
+        "undo_point": "Undo Point",
+        "redo_point": "Redo Point",
+        "timeline_page": "Page",
+        "no_point_events": "No point events recorded for this match.",
+        "leaderboard": "Leaderboard",
+        "no_team_stats": "No finished matches yet.",
+        "team": "Team",
+        "matches_played": "Matches",
+        "wins": "Wins",
+        "losses": "Losses",
+        "set_difference": "Sets +/-",
+        "game_difference": "Games +/-",
+        "tiebreaks": "Tiebreaks",
+        "average_duration": "Avg. Duration",
+        "serve_points_won": "Serve Points Won",
+        "longest_serve_streak": "Longest Serve Streak",
+        "metrics": "Performance Metrics",
+        "pause_clock": "Pause Clock",
+        "resume_clock": "Resume Clock",
+        "time_between_points": "Time Between Points",
+        "current_game_time": "Current Game",
+        "point_timing": "Point Timing",
+        "average_game_duration": "Avg. Game Duration",
+        "set_durations": "Set Durations",
+        "replay_match": "Replay",
+        "jump_to": "Jump to",
+        "seek_point": "Point",
+        "seek_game": "Game",
+        "seek_set": "Set",
+        "points_played": "Points played",
+        "game_mode": "Game mode",
+        "regular": "Regular game",
+        "tiebreak": "Tiebreak",
+        "super_tiebreak": "Super tiebreak",
     },
     "pt": {
         "title": "Beach Tennis Placar",
@@ -59,6 +100,47 @@ translations = {
         "match_over": "Partida Encerrada! Vencedor: ",
         "match_in_progress_status": "Partida em andamento",
         "current_time": "Hora Atual: ",
+        "court": "Quadra",
+        "new_court": "Identificador da nova quadra",
+        "add_court": "Adicionar Quadra",
+        "invalid_court": "Identificadores de quadra só podem usar letras, dígitos, '-' e '_'.",
+        "all_courts": "Todas as quadras",
+        "no_active_courts": "Nenhuma quadra ativa.",
+        "win_probability": "Probabilidade de vitória: ",
+        "undo_point": "Desfazer Ponto",
+        "redo_point": "Refazer Ponto",
+        "timeline_page": "Página",
+        "no_point_events": "Nenhum ponto registrado para esta partida.",
+        "leaderboard": "Classificação",
+        "no_team_stats": "Nenhuma partida finalizada ainda.",
+        "team": "Dupla",
+        "matches_played": "Partidas",
+        "wins": "Vitórias",
+        "losses": "Derrotas",
+        "set_difference": "Saldo de Sets",
+        "game_difference": "Saldo de Games",
+        "tiebreaks": "Tiebreaks",
+        "average_duration": "Duração Média",
+        "serve_points_won": "Pontos Ganhos no Saque",
+        "longest_serve_streak": "Maior Sequência no Saque",
+        "metrics": "Métricas de Desempenho",
+        "pause_clock": "Pausar Relógio",
+        "resume_clock": "Retomar Relógio",
+        "time_between_points": "Tempo Entre Pontos",
+        "current_game_time": "Game Atual",
+        "point_timing": "Tempo dos Pontos",
+        "average_game_duration": "Duração Média do Game",
+        "set_durations": "Duração dos Sets",
+        "replay_match": "Rever Partida",
+        "jump_to": "Ir para",
+        "seek_point": "Ponto",
+        "seek_game": "Game",
+        "seek_set": "Set",
+        "points_played": "Pontos jogados",
+        "game_mode": "Modo do game",
+        "regular": "Game normal",
+        "tiebreak": "Tiebreak",
+        "super_tiebreak": "Super tiebreak",
     }
 }
 
@@ -0,0 +1,3 @@
+# One module per app page, each with a render() function. app.py imports a
+# page's module only when that page is shown, so each page's dependencies
+# (pandas for Match Analysis) are loaded only by the sessions that need them.
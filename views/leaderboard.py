@@ -0,0 +1,9 @@
+import streamlit as st
+
+import scoreboard
+import team_stats
+from translations import get_translation
+
+def render(lang):
+    st.title(get_translation(lang, "leaderboard"))
+    st.markdown(scoreboard.build_leaderboard_table(team_stats.leaderboard(), lang), unsafe_allow_html=True)
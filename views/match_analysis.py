@@ -0,0 +1,113 @@
+import streamlit as st
+
+import history_store
+import point_timing
+import scoreboard
+import seek_index
+import timeline
+from translations import get_translation
+
+# Rows per page of the Match Analysis timeline.
+TIMELINE_PAGE_SIZE = 50
+
+# Stored matches never change, so timelines are cached by match id. The
+# match date is part of the key so a recreated history database, which
+# numbers its matches from 1 again, does not hit stale entries.
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_timeline(match_id, match_date):
+    return timeline.build_timeline(match_id)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_timeline_csv(match_id, match_date):
+    return timeline.timeline_csv(load_timeline(match_id, match_date))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_timing(match_id, match_date):
+    record = history_store.load_point_record(match_id)
+    if record is None:
+        return None
+    return point_timing.record_timer(record).summary()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_seek_index(match_id, match_date):
+    return seek_index.load(match_id)
+
+def _format_ms(ms):
+    seconds = round(ms / 1000)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def render(lang):
+    st.title(get_translation(lang, "match_analysis_title"))
+    history = history_store.summaries()
+    if not history:
+        st.info(get_translation(lang, "no_match_history_analysis"))
+    else:
+        # Build a list of match labels for selection.
+        match_options = [f"{entry['date']} - {entry['team1']} vs {entry['team2']}" for entry in history]
+        selected_index = st.selectbox(get_translation(lang, "select_match"), options=list(range(len(history))),
+                                      format_func=lambda x: match_options[x])
+        selected_match = history[selected_index]
+        st.write(f"### {get_translation(lang, 'point_by_point_timeline')}")
+
+        df_timeline = load_timeline(selected_match["id"], selected_match["date"])
+        if len(df_timeline):
+            # Render one page of the timeline at a time.
+            page_count = (len(df_timeline) + TIMELINE_PAGE_SIZE - 1) // TIMELINE_PAGE_SIZE
+            timeline_page = 1
+            if page_count > 1:
+                timeline_page = st.number_input(get_translation(lang, "timeline_page"), min_value=1,
+                                                max_value=page_count, value=1,
+                                                key=f"timeline-page-{selected_match['id']}")
+            start = (timeline_page - 1) * TIMELINE_PAGE_SIZE
+            page_rows = df_timeline.iloc[start:start + TIMELINE_PAGE_SIZE]
+            st.markdown(page_rows.style.hide(axis="index").to_html(), unsafe_allow_html=True)
+
+            # Download CSV option; the file is only generated when clicked.
+            match_id, match_date = selected_match["id"], selected_match["date"]
+            st.download_button(
+                label=get_translation(lang, "download_csv"),
+                data=lambda: load_timeline_csv(match_id, match_date),
+                file_name="point_by_point_timeline.csv",
+                mime="text/csv",
+                key="download-csv"
+            )
+        else:
+            st.info(get_translation(lang, "no_point_events"))
+
+        timing = load_timing(selected_match["id"], selected_match["date"])
+        if timing and timing["points"]:
+            st.write(f"### {get_translation(lang, 'point_timing')}")
+            col1, col2, col3 = st.columns(3)
+            col1.metric(get_translation(lang, "time_between_points"), f"{timing['mean_gap_ms'] / 1000:.1f} s")
+            game_durations = timing["game_durations_ms"]
+            col2.metric(get_translation(lang, "average_game_duration"),
+                        _format_ms(sum(game_durations) / len(game_durations)))
+            col3.metric(get_translation(lang, "set_durations"),
+                        " / ".join(_format_ms(ms) for ms in timing["set_durations_ms"]))
+
+        # Scrub through the match: the full score at any point, or at the
+        # start of any game or set.
+        index = load_seek_index(selected_match["id"], selected_match["date"])
+        if index is not None and index.points:
+            st.write(f"### {get_translation(lang, 'replay_match')}")
+            col1, col2 = st.columns([1, 3])
+            seek_by = col1.selectbox(get_translation(lang, "jump_to"), ("point", "game", "set"),
+                                     format_func=lambda key: get_translation(lang, f"seek_{key}"),
+                                     key=f"seek-by-{selected_match['id']}")
+            key = f"seek-{seek_by}-{selected_match['id']}"
+            if seek_by == "point":
+                number = col2.slider(get_translation(lang, "seek_point"), 0, index.points, index.points, key=key)
+                state = index.at_point(number)
+            elif seek_by == "game":
+                number = col2.number_input(get_translation(lang, "seek_game"), min_value=1,
+                                           max_value=index.games, value=1, key=key)
+                state = index.at_game(number)
+            else:
+                number = col2.number_input(get_translation(lang, "seek_set"), min_value=1,
+                                           max_value=index.sets, value=1, key=key)
+                state = index.at_set(number)
+            st.markdown(scoreboard.SCOREBOARD_CSS, unsafe_allow_html=True)
+            st.markdown(scoreboard.render_scoreboard(scoreboard.build_scoreboard_html(state, lang),
+                                                     state.get_match_time()), unsafe_allow_html=True)
+            st.caption(f"{get_translation(lang, 'points_played')}: {len(state.point_teams)} · "
+                       f"{get_translation(lang, 'game_mode')}: {get_translation(lang, state.game_mode)}")
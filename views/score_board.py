@@ -0,0 +1,45 @@
+import datetime
+
+import streamlit as st
+
+import live_cache
+import metrics
+import scoreboard
+from translations import get_translation
+
+# The Score Board reruns only these fragments: the score and clock every
+# second, the last matches table every HISTORY_REFRESH_SECONDS (it is rebuilt
+# only when a match was added). The rest of the page is drawn once.
+BOARD_REFRESH_SECONDS = 1
+HISTORY_REFRESH_SECONDS = 5
+
+@st.fragment(run_every=BOARD_REFRESH_SECONDS)
+@metrics.timed("fragment.live_board")
+def live_board(court_id, lang, show_all_courts):
+    current_time = datetime.datetime.now().strftime("%H:%M:%S")
+    st.markdown(f"<div style='text-align: right; font-size: 18px; color: #555;'>{get_translation(lang, 'current_time')}{current_time}</div>", unsafe_allow_html=True)
+    if show_all_courts:
+        st.markdown(live_cache.courts_table(lang), unsafe_allow_html=True)
+    else:
+        # Every open display reads the court from the process-wide cache,
+        # which decodes each state version once. The match is shared and
+        # read-only: finished matches are recorded by whoever scored them.
+        match_state, scoreboard_html = live_cache.board(court_id, lang)
+        st.markdown(scoreboard.render_scoreboard(scoreboard_html, scoreboard.match_clock(match_state)), unsafe_allow_html=True)
+
+@st.fragment(run_every=HISTORY_REFRESH_SECONDS)
+@metrics.timed("fragment.recent_matches")
+def recent_matches(lang):
+    history_table = live_cache.history_table(3)
+    if history_table:
+        st.markdown(history_table, unsafe_allow_html=True)
+    else:
+        st.info(get_translation(lang, "no_match_history"))
+
+def render(lang, court_id, show_all_courts):
+    st.title(get_translation(lang, "title"))
+    st.markdown(scoreboard.SCOREBOARD_CSS, unsafe_allow_html=True)
+    live_board(court_id, lang, show_all_courts)
+
+    st.write(f"### {get_translation(lang, 'last_3_matches')}")
+    recent_matches(lang)
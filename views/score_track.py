@@ -0,0 +1,91 @@
+import streamlit as st
+
+import point_timing
+import state_manager
+import win_probability
+from match import Match
+from translations import get_translation
+
+def render(lang, court_id, match_state):
+    if "show_new_game_form" not in st.session_state:
+        st.session_state.show_new_game_form = False
+
+    st.title(get_translation(lang, "title"))
+
+    if match_state is None or match_state.match_over:
+        st.info(get_translation(lang, "no_match_in_progress"))
+        if not st.session_state.show_new_game_form:
+            if st.button(get_translation(lang, "add_new_game")):
+                st.session_state.show_new_game_form = True
+        if st.session_state.show_new_game_form:
+            with st.form("new_game_form"):
+                team1_name = st.text_input(get_translation(lang, "team_1_name"), "Team A")
+                team2_name = st.text_input(get_translation(lang, "team_2_name"), "Team B")
+                games_per_set = st.number_input(get_translation(lang, "games_per_set"), min_value=1, value=6)
+                total_sets = st.number_input(get_translation(lang, "total_sets"), min_value=1, value=1)
+                submitted = st.form_submit_button(get_translation(lang, "start_match"))
+                if submitted:
+                    new_match = Match(team1_name, team2_name, games_per_set, total_sets)
+                    state_manager.save_state(new_match, court_id)
+                    # Solve this format's win-probability table now rather than on a board refresh.
+                    win_probability.get_probability_table(games_per_set, total_sets)
+                    st.success(get_translation(lang, "match_in_progress"))
+                    st.session_state.show_new_game_form = False
+                    st.rerun()
+    else:
+        st.success(get_translation(lang, "match_in_progress"))
+        game_points = match_state.game_points()
+        for team_index, column in enumerate(st.columns(2)):
+            with column:
+                st.metric(label="Sets", value=match_state._sets[team_index])
+                st.metric(label="Games", value=match_state._games[team_index])
+                st.metric(label="Points", value=game_points[team_index])
+
+        # Kept across reruns and fed only the points scored since the last one.
+        timer_key = f"point-timer-{court_id}"
+        timing = st.session_state[timer_key] = point_timing.advance_timer(
+            st.session_state.get(timer_key), match_state)
+        if timing.points:
+            rolling_gap = timing.summary()["rolling_gap_ms"] / 1000
+            game_time = (match_state.elapsed_ms() - timing.game_start_ms) // 1000
+            st.caption(f"{get_translation(lang, 'time_between_points')}: {rolling_gap:.1f} s · "
+                       f"{get_translation(lang, 'current_game_time')}: {game_time // 60}:{game_time % 60:02d}")
+
+        st.write("### Add Point")
+        col1, col2 = st.columns(2)
+        # Keyed by team index, so teams with the same name get two buttons.
+        if col1.button(match_state.team1_name, key="point-0"):
+            state_manager.save_point_index(match_state, 0, court_id)
+            st.rerun()
+        if col2.button(match_state.team2_name, key="point-1"):
+            state_manager.save_point_index(match_state, 1, court_id)
+            st.rerun()
+
+        col1, col2 = st.columns(2)
+        if col1.button(get_translation(lang, "undo_point"), disabled=not match_state.can_undo):
+            state_manager.undo_point(match_state, court_id)
+            st.rerun()
+        if col2.button(get_translation(lang, "redo_point"), disabled=not match_state.can_redo):
+            state_manager.redo_point(match_state, court_id)
+            st.rerun()
+
+        if match_state.paused:
+            if st.button(get_translation(lang, "resume_clock")):
+                state_manager.resume_match(match_state, court_id)
+                st.rerun()
+        elif st.button(get_translation(lang, "pause_clock")):
+            state_manager.pause_match(match_state, court_id)
+            st.rerun()
+
+        if st.button(get_translation(lang, "reset_match")):
+            st.session_state.confirm_reset = True
+        if st.session_state.get("confirm_reset", False):
+            st.warning(get_translation(lang, "confirm_reset"))
+            col1, col2 = st.columns(2)
+            if col1.button(get_translation(lang, "yes_reset")):
+                state_manager.clear_state(court_id)
+                st.session_state.confirm_reset = False
+                st.rerun()
+            if col2.button(get_translation(lang, "cancel")):
+                st.session_state.confirm_reset = False
+                st.rerun()
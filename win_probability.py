@@ -0,0 +1,140 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+import history_store
+import team_stats
+from scoring_table import get_table
+
+WIN_PROBABILITY_CACHE_DIR = "win_probability_cache"
+
+# Point-win probabilities the table is solved for: 0.00, 0.01, ..., 1.00.
+POINT_PROBABILITY_STEPS = 100
+
+# Pseudo-points pulling an estimate towards 50% early in a match.
+PRIOR_POINTS = 20
+
+def _solve(table):
+    # Exact probability that team 1 wins from every state, for every point
+    # probability p on the grid: V = p * V[team 1 scores] + (1 - p) *
+    # V[team 2 scores], with finished matches fixed at 1 or 0. States are
+    # memoized in reverse topological order. The only cycles are tiebreak
+    # deuces (deuce -> advantage -> deuce), which are solved in closed form:
+    # deuce = (p^2 * W1 + q^2 * W2) / (1 - 2pq), where W1/W2 are the values
+    # after either team converts its advantage.
+    p = np.linspace(0.0, 1.0, POINT_PROBABILITY_STEPS + 1)
+    q = 1.0 - p
+    next_state = table.next_state
+    running = table.winners == -1
+    deuces, advantages = _deuces(table)
+
+    values = np.zeros((len(table.states), len(p)))
+    values[table.winners == 0] = 1.0
+    for state in _post_order(table, deuces, advantages):
+        if not running[state] or state in advantages:
+            continue
+        next1, next2 = next_state[state]
+        if state in deuces:
+            win1 = values[next_state[next1, 0]]
+            win2 = values[next_state[next2, 1]]
+            values[state] = (p * p * win1 + q * q * win2) / (1.0 - 2.0 * p * q)
+            values[next1] = p * win1 + q * values[state]
+            values[next2] = p * values[state] + q * win2
+        else:
+            values[state] = p * values[next1] + q * values[next2]
+    return values.T.copy()
+
+def _deuces(table):
+    # Running states that a point each way leads back to (tiebreak deuces),
+    # and the advantage states between them.
+    next_state = table.next_state
+    running = table.winners == -1
+    deuces = {
+        state for state in range(len(table.states))
+        if running[state]
+        and next_state[next_state[state, 0], 1] == state
+        and next_state[next_state[state, 1], 0] == state
+    }
+    advantages = {int(next_state[state, team]) for state in deuces for team in (0, 1)}
+    return deuces, advantages
+
+def _post_order(table, deuces, advantages):
+    # Every state after all of its successors, ignoring the edges that fall
+    # back from an advantage to its deuce.
+    next_state = table.next_state
+    seen = set()
+    order = []
+    stack = [(table.initial_state, False)]
+    while stack:
+        state, expanded = stack.pop()
+        if expanded:
+            order.append(state)
+            continue
+        if state in seen:
+            continue
+        seen.add(state)
+        stack.append((state, True))
+        for following in next_state[state]:
+            following = int(following)
+            if following == state or (state in advantages and following in deuces):
+                continue
+            if following not in seen:
+                stack.append((following, False))
+    return order
+
+def _cache_path(games_per_set, total_sets):
+    return os.path.join(WIN_PROBABILITY_CACHE_DIR, f"win_probability_{games_per_set}_{total_sets}.npy")
+
+@lru_cache(maxsize=None)
+def get_probability_table(games_per_set=6, total_sets=3):
+    # Solved once per format and kept on disk, so live lookups never solve.
+    table = get_table(games_per_set, total_sets)
+    path = _cache_path(games_per_set, total_sets)
+    if os.path.exists(path):
+        values = np.load(path)
+        if values.shape == (POINT_PROBABILITY_STEPS + 1, len(table.states)):
+            return values
+    values = _solve(table)
+    os.makedirs(WIN_PROBABILITY_CACHE_DIR, exist_ok=True)
+    np.save(path, values)
+    return values
+
+def win_probability(match, point_probability):
+    # Probability that team 1 wins `match` from its current score, given the
+    # probability that team 1 wins any single point.
+    values = get_probability_table(match.games_per_set, match.total_sets)
+    state = get_table(match.games_per_set, match.total_sets).state_id(match)
+    step = int(round(point_probability * POINT_PROBABILITY_STEPS))
+    return float(values[step, state])
+
+def estimate_point_probability(match):
+    # Team 1's share of the points played so far in this match, starting
+    # from the teams' share in their recorded matches.
+    prior = estimate_point_probability_from_history(match.team1_name, match.team2_name)
+    team1_points = len(match.point_teams) - sum(match.point_teams)
+    return (team1_points + PRIOR_POINTS * prior) / (len(match.point_teams) + PRIOR_POINTS)
+
+def estimate_point_probability_from_history(team1_name, team2_name):
+    # Team 1's expected share of points against team 2, from the share of
+    # points each team won in its past matches (0.5 without history).
+    version = history_store.history_version()
+    if version is None:
+        return 0.5
+    return _history_point_probability(team_stats.team_key(team1_name), team_stats.team_key(team2_name),
+                                      version)
+
+@lru_cache(maxsize=256)
+def _history_point_probability(team1_key, team2_key, history_version):
+    # Cached until the history changes; team_stats keeps the point totals, so
+    # this reads two rows rather than the teams' matches.
+    def points_share(key):
+        totals = team_stats.team_totals(key)
+        won, lost = (totals["points_won"], totals["points_lost"]) if totals else (0, 0)
+        return (won + PRIOR_POINTS / 2) / (won + lost + PRIOR_POINTS)
+
+    share1 = points_share(team1_key)
+    share2 = points_share(team2_key)
+    # Odds-ratio combination of the two teams' point shares.
+    odds = (share1 / (1 - share1)) / (share2 / (1 - share2))
+    return odds / (1 + odds)